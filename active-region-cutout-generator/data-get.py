@@ -1,13 +1,17 @@
 import warnings
 warnings.filterwarnings("ignore", message = "numpy.dtype size changed")
 
+from catalog import Catalog
 from datetime import datetime
+from downloader import download, jsoc_resolver, load_manifest, plan, resolve
 from recorder import Recorder
 from sunpy.net import Fido, attrs as a
+import argparse
 import astropy.units as u
 import getpass
 import os
 import pprint
+import sys
 
 #########################
 
@@ -63,6 +67,38 @@ SEGMENTS = {
 
 #########################
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--manifest", default = None)
+parser.add_argument("--workers", type = int, default = 4)
+args = parser.parse_args()
+
+if args.manifest:
+	MANIFEST = load_manifest(args.manifest)
+	for request in MANIFEST["requests"]:
+		request.setdefault("dest", "%s/resources/%s-fits-files" % (MAIN_DIR, request["series"].split(".")[0]))
+
+	JOBS = plan(MANIFEST)
+	PRINTER.info_text("%d export requests planned" % len(JOBS))
+
+	CATALOG = Catalog()
+	CATALOG.scan(sorted(set(job["dest"] for job in JOBS if os.path.isdir(job["dest"]))))
+	TRANSFERS = resolve(JOBS, jsoc_resolver(MANIFEST.get("email", EMAIL)), CATALOG.paths())
+	PRINTER.info_text("%d files to download" % len(TRANSFERS))
+
+	def report(path, size, error):
+		if error is None:
+			PRINTER.info_text("%s (%d bytes)" % (os.path.basename(path), size))
+		else:
+			PRINTER.warn_text("%s failed: %s" % (os.path.basename(path), error))
+
+	DONE, FAILED = download(TRANSFERS, args.workers, report = report)
+	PRINTER.info_text("Done: %d files downloaded, %d failed (rerun to resume)" % (len(DONE), len(FAILED)))
+	PRINTER.line()
+	PRINTER.display_end_time("data-get")
+	sys.exit(1 if FAILED else 0)
+
+#########################
+
 PRINTER.info_text("Instruments: AIA, HMI")
 INSTRUMENT = PRINTER.input_text("Enter instrument").lower()
 
@@ -172,4 +208,4 @@ elif INSTRUMENT == "hmi":
 
 PRINTER.info_text("Done: %d files downloaded" % len(results[0]))
 PRINTER.line()
-RECORDER.display_end_time("data-get")
+PRINTER.display_end_time("data-get")
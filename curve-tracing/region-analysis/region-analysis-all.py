@@ -1,80 +1,57 @@
 import warnings
 warnings.filterwarnings("ignore", message = "numpy.dtype size changed")
 
+from align import align_catalog
 from astropy.coordinates import SkyCoord
+from boxstats import BoxStats
+from catalog import Catalog
+from channels import AIA_CHANNELS, CHANNELS
 from datetime import datetime
+from disk import disk_geometry, on_disk
+from hmialign import HMIAligner
 from IPython.core import debugger ; debug = debugger.Pdb().set_trace
+from lazymap import LazyMapSequence
+from peaks import find_maxima
 from recorder import Recorder
 from skimage.transform import resize
-from scipy.ndimage import zoom as interpolate
+from thresholds import match_thresholds
 from scipy.ndimage.morphology import binary_dilation as grow_mask
-from scipy.spatial import distance
 import astropy.units as u
 import getpass
 import matplotlib.pyplot as plt
 import numpy as np
-import os
 import scipy
-import scipy.ndimage as ndimage
-import scipy.ndimage.filters as filters
-import sunpy.map as smap
 
 MAIN_DIR = "/Users/%s/Desktop/lmsal" % getpass.getuser()
-RECORDER = Recorder("database.csv")
+ARCHIVE = "%s/resources/data_%s.tar" % (MAIN_DIR, datetime.now().strftime("%Y-%m-%d_%H.%M.%S"))
+RECORDER = Recorder("database.csv", [("raw image", "raw-images"),
+									  ("binary image", "binary-images"),
+									  ("threshold image", "threshold-images"),
+									  ("magnetogram", "magnetogram-images"),
+									  ("masked magnetogram", "masked-magnetogram-images")], archive = ARCHIVE)
 RECORDER.display_start_time("loop-analysis")
 
-os.system("rm -rf resources/region-data/raw-images && mkdir resources/region-data/raw-images")
-os.system("rm -rf resources/region-data/binary-images && mkdir resources/region-data/binary-images")
-os.system("rm -rf resources/region-data/threshold-images && mkdir resources/region-data/threshold-images")
-os.system("rm -rf resources/region-data/magnetogram-images && mkdir resources/region-data/magnetogram-images")
-os.system("rm -rf resources/region-data/masked-magnetogram-images && mkdir resources/region-data/masked-magnetogram-images")
+CATALOG = Catalog()
+RECORDER.info_text("%d new files indexed" % CATALOG.scan(["%s/resources/aia-fits-files/" % MAIN_DIR, "%s/resources/hmi-fits-files/" % MAIN_DIR]))
+ALIGNMENT = align_catalog(CATALOG, list(CHANNELS), reference = "AIA171")
+for line in ALIGNMENT.report():
+	RECORDER.info_text(line)
+FILES = ALIGNMENT.columns()
 
-RECORDER.info_text("Importing AIA94 data")
-MAPCUBE_AIA_94 = smap.Map("%s/resources/aia-fits-files/*.94.image_lev1.fits" % MAIN_DIR, sequence = True)
+MAPCUBE = {}
 
-RECORDER.info_text("Importing AIA131 data")
-MAPCUBE_AIA_131 = smap.Map("%s/resources/aia-fits-files/*.131.image_lev1.fits" % MAIN_DIR, sequence = True)
+for name in CHANNELS:
+	RECORDER.info_text("Importing %s data" % name)
+	MAPCUBE[name] = LazyMapSequence(FILES[name])
 
-RECORDER.info_text("Importing AIA171 data")
-MAPCUBE_AIA_171 = smap.Map("%s/resources/aia-fits-files/*.171.image_lev1.fits" % MAIN_DIR, sequence = True)
-
-RECORDER.info_text("Importing AIA193 data")
-MAPCUBE_AIA_193 = smap.Map("%s/resources/aia-fits-files/*.193.image_lev1.fits" % MAIN_DIR, sequence = True)
-
-RECORDER.info_text("Importing AIA211 data")
-MAPCUBE_AIA_211 = smap.Map("%s/resources/aia-fits-files/*.211.image_lev1.fits" % MAIN_DIR, sequence = True)
-
-RECORDER.info_text("Importing AIA304 data")
-MAPCUBE_AIA_304 = smap.Map("%s/resources/aia-fits-files/*.304.image_lev1.fits" % MAIN_DIR, sequence = True)
-
-RECORDER.info_text("Importing AIA335 data")
-MAPCUBE_AIA_335 = smap.Map("%s/resources/aia-fits-files/*.335.image_lev1.fits" % MAIN_DIR, sequence = True)
-
-RECORDER.info_text("Importing HMI magnetogram data\n")
-MAPCUBE_HMI = smap.Map("%s/resources/hmi-fits-files/*.fits" % MAIN_DIR, sequence = True)
-
-MAPCUBE = {
-	"AIA94" : MAPCUBE_AIA_94,
-	"AIA131" : MAPCUBE_AIA_131,
-	"AIA171" : MAPCUBE_AIA_171,
-	"AIA193" : MAPCUBE_AIA_193,
-	"AIA211" : MAPCUBE_AIA_211,
-	"AIA304" : MAPCUBE_AIA_304,
-	"AIA335" : MAPCUBE_AIA_335,
-	"HMI" : MAPCUBE_HMI
-}
-
-MEASUREMENTS = ["AIA94", "AIA131",
-				"AIA171", "AIA193",
-				"AIA211", "AIA335",
-				"AIA304"]
+MEASUREMENTS = [name for name in AIA_CHANNELS if name != "AIA304"] + ["AIA304"]
+HMI_ALIGNER = HMIAligner(fill = 99999)
 
 LOOP_ID = 1
 NUM_LOOPS = 0
 NUM_OFF_DISK = 0
 NUM_SMALL = 0
 # NUM_UNIPOLAR = 0
-ADD_OFFDISK = False
 ADD_SMALL = False
 # ADD_UNIPOLAR = False
 
@@ -86,19 +63,22 @@ for i in range(len(MAPCUBE["AIA171"])):
 	MIN_DISTANCE_FROM_OTHER_REGIONS = 1000 # larger value --> fewer regions
 	MIN_THRESHOLD_OF_REGION = 0.6 * raw_data_171.max() # larger decimal --> select increasingly brighter regions
 
-	data_max = filters.maximum_filter(raw_data_171,
-									  MIN_DISTANCE_FROM_OTHER_REGIONS)
-	maxima = (raw_data_171 == data_max)
-	data_min = filters.minimum_filter(raw_data_171,
-									  MIN_DISTANCE_FROM_OTHER_REGIONS)
-	diff = ((data_max - data_min) > MIN_THRESHOLD_OF_REGION)
-	maxima[diff == 0] = 0
-
-	labeled, num_objects = ndimage.label(maxima)
-	xy_maxima = np.array(ndimage.center_of_mass(raw_data_171,
-												labeled,
-												range(1, num_objects + 1)))
-	xy_maxima = xy_maxima.astype(int)
+	# same maxima as maximum_filter / minimum_filter over the region spacing, from a block-reduced frame
+	xy_maxima = find_maxima(raw_data_171,
+							MIN_DISTANCE_FROM_OTHER_REGIONS,
+							MIN_THRESHOLD_OF_REGION)
+
+	# regions farther than (RADIUS - OFF_DISK_THRESHOLD) pixels from the solar center of any channel are
+	# ignored; one vectorized test per channel before any per-region work
+	OFF_DISK_THRESHOLD = 100
+	ON_DISK = np.ones(len(xy_maxima), dtype = bool)
+	for MEAS in MEASUREMENTS:
+		center, radius = disk_geometry(MAPCUBE[MEAS][i])
+		ON_DISK &= on_disk(xy_maxima, center, radius, OFF_DISK_THRESHOLD)
+	if not ON_DISK.all():
+		RECORDER.warn_text("%d off-disk region(s) skipped" % np.count_nonzero(~ON_DISK))
+	NUM_OFF_DISK += np.count_nonzero(~ON_DISK)
+	xy_maxima = xy_maxima[ON_DISK]
 
 	if xy_maxima.shape[0] == 0:
 		hp_maxima = np.array([])
@@ -107,15 +87,19 @@ for i in range(len(MAPCUBE["AIA171"])):
 		hp_maxima = MAPCUBE["AIA171"][i].pixel_to_world(xy_maxima[:, 1] * u.pixel,
 														xy_maxima[:, 0] * u.pixel)
 
+	MIN_AVERAGE = 240.0 # larger value --> smaller region dimensions
+
+	# region bounds depend only on the AIA304 frame: one summed-area table, every region at once
+	SIZES = BoxStats(raw_data_304).grow(xy_maxima, MIN_AVERAGE) if len(hp_maxima) > 0 else []
+
 	for j in range(len(hp_maxima)):
 
 		for MEAS in MEASUREMENTS:
 
-			OFF_DISK_THRESHOLD = 100 # pixels; regions farther than (RADIUS - OFF_DISK_THRESHOLD) pixels from the solar center are ignored
-			MIN_AVERAGE = 240.0 # larger value --> smaller region dimensions
 			LOW_THRESHOLD_304 = 530 # larger value --> fewer region pixels
 
 			RECORDER.show_instr(MEAS)
+			RECORDER.begin()
 			RECORDER.write_ID(LOOP_ID)
 
 			when = MAPCUBE[MEAS][i].date
@@ -124,24 +108,10 @@ for i in range(len(MAPCUBE["AIA171"])):
 			where_xy = xy_maxima[j]
 			RECORDER.write_xywhere(where_xy)
 
-			center = np.array([int(MAPCUBE[MEAS][i].reference_pixel[0].value),
-							   int(MAPCUBE[MEAS][i].reference_pixel[1].value)])
-
-			radius = (MAPCUBE[MEAS][i].rsun_obs / MAPCUBE[MEAS][i].scale[0]).value
-
-			if distance.euclidean(center, where_xy) > (radius - OFF_DISK_THRESHOLD):
-				RECORDER.off_disk()
-				ADD_OFFDISK = True
-				break
-
 			where_hpc = hp_maxima[j]
 			RECORDER.write_hpcwhere(where_hpc)
 
-			HALF_DIM_PXL = 1
-
-			while np.average(raw_data_304[xy_maxima[j][0] - HALF_DIM_PXL : xy_maxima[j][0] + HALF_DIM_PXL,
-							 xy_maxima[j][1] - HALF_DIM_PXL: xy_maxima[j][1] + HALF_DIM_PXL]) > MIN_AVERAGE:
-				HALF_DIM_PXL += 1
+			HALF_DIM_PXL = int(SIZES[j])
 
 			if HALF_DIM_PXL < 50.0:
 				RECORDER.too_small()
@@ -165,22 +135,17 @@ for i in range(len(MAPCUBE["AIA171"])):
 			cd_data = MAPCUBE[MEAS][i].data[xy_maxima[j][0] - HALF_DIM_PXL : xy_maxima[j][0] + HALF_DIM_PXL,
 											xy_maxima[j][1] - HALF_DIM_PXL: xy_maxima[j][1] + HALF_DIM_PXL]
 
-			cd_data_304 = MAPCUBE["AIA304"][i].data[xy_maxima[j][0] - HALF_DIM_PXL : xy_maxima[j][0] + HALF_DIM_PXL,
-													xy_maxima[j][1] - HALF_DIM_PXL: xy_maxima[j][1] + HALF_DIM_PXL]
-			
+			# thresholds for every channel of this region in one batch: the integer LOW_THRESHOLD
+			# leaving as many pixels as AIA304 has above LOW_THRESHOLD_304
+			if MEAS == MEASUREMENTS[0]:
+				cutouts = np.array([MAPCUBE[name][i].data[xy_maxima[j][0] - HALF_DIM_PXL : xy_maxima[j][0] + HALF_DIM_PXL,
+														  xy_maxima[j][1] - HALF_DIM_PXL: xy_maxima[j][1] + HALF_DIM_PXL]
+									for name in MEASUREMENTS])
+				target = np.count_nonzero(cutouts[MEASUREMENTS.index("AIA304")] > LOW_THRESHOLD_304)
+				THRESHOLDS = dict(zip(MEASUREMENTS, match_thresholds(cutouts, target)))
+
 			HIGH_THRESHOLD = np.inf
-			LOW_THRESHOLD = 0
-			previous_low = 0
-			new_low = 0
-			target = len(cd_data_304[np.where(cd_data_304 > LOW_THRESHOLD_304)])
-
-			while len(cd_data[np.where(cd_data > LOW_THRESHOLD)]) > target:
-				previous_low = len(cd_data[np.where(cd_data > LOW_THRESHOLD)])
-				LOW_THRESHOLD += 1
-				new_low = len(cd_data[np.where(cd_data > LOW_THRESHOLD)])
-			
-			if np.abs(target - new_low) > np.abs(target - previous_low):
-				LOW_THRESHOLD -= 1
+			LOW_THRESHOLD = THRESHOLDS[MEAS]
 
 			threshold_data = cd_data[np.where(cd_data > LOW_THRESHOLD)]
 
@@ -214,25 +179,13 @@ for i in range(len(MAPCUBE["AIA171"])):
 								 MAPCUBE[MEAS][i].detector,
 								 MAPCUBE[MEAS][i].wavelength)
 			
-			hmi_raw_data = MAPCUBE["HMI"][i].data
-
-			casted_hmi_data = np.zeros((4096, 4096))
-			casted_hmi_data[casted_hmi_data == 0] = 99999
-			scale = (MAPCUBE["HMI"][i].scale[0]/MAPCUBE[MEAS][i].scale[0]).value
-			scale = float("%.3f" % scale)
-
-			interpolated_hmi_data = interpolate(hmi_raw_data, scale, order = 1)
-			interpolated_hmi_data = np.flip(interpolated_hmi_data, (0,1))
-
-			x_size = interpolated_hmi_data.shape[0]
-			y_size = interpolated_hmi_data.shape[1]
 			x_center = int(MAPCUBE[MEAS][i].reference_pixel.x.value + 0.5) - 12
 			y_center = int(MAPCUBE[MEAS][i].reference_pixel.y.value + 0.5) + 4
 
-			casted_hmi_data[(y_center - 1 - y_size/2) : (y_center + y_size/2), (x_center - 1 - x_size/2) : (x_center + x_size/2)] = interpolated_hmi_data
-
-			hmi_cd_data = casted_hmi_data[x1 : x2,
-										  y1 : y2]
+			# resamples only the cutout instead of the full 4096 x 4096 canvas
+			hmi_cd_data = HMI_ALIGNER.window(MAPCUBE["HMI"][i], MAPCUBE[MEAS][i], (y_center, x_center),
+											 (xy_maxima[j][0] - HALF_DIM_PXL, xy_maxima[j][0] + HALF_DIM_PXL),
+											 (xy_maxima[j][1] - HALF_DIM_PXL, xy_maxima[j][1] + HALF_DIM_PXL))
 
 			RECORDER.write_image(3,
 								 LOOP_ID,
@@ -250,8 +203,9 @@ for i in range(len(MAPCUBE["AIA171"])):
 
 			unsig_gauss = np.sum(np.abs(hmi_threshold_image_data))
 			avg_gauss = np.average(hmi_threshold_image_data)
+			med_gauss = np.median(hmi_threshold_image_data)
 
-			RECORDER.write_gauss(unsig_gauss, avg_gauss)
+			RECORDER.write_gauss(unsig_gauss, avg_gauss, med_gauss)
 
 			# if np.abs(avg_gauss) > 4.0:
 			# 	RECORDER.unipolar()
@@ -264,14 +218,11 @@ for i in range(len(MAPCUBE["AIA171"])):
 								 MAPCUBE[MEAS][i].detector,
 								 MAPCUBE[MEAS][i].wavelength)
 
-			RECORDER.new_line()
+			RECORDER.commit()
 
 		if ADD_SMALL:
 			NUM_SMALL += 1
 			ADD_SMALL = False
-		if ADD_OFFDISK:
-			NUM_OFF_DISK += 1
-			ADD_OFFDISK = False
 		# if ADD_UNIPOLAR:
 		# 	NUM_UNIPOLAR += 1
 		# 	ADD_UNIPOLAR = False
@@ -281,10 +232,7 @@ for i in range(len(MAPCUBE["AIA171"])):
 
 RECORDER.remove_duplicates()
 
-RECORDER.info_text("Compressing database\n")
-os.chdir("resources/")
-os.system("zip -r -X data_%s.zip region-data" % str(datetime.now().strftime("%Y-%m-%d_%H.%M.%S")))
-os.chdir("../")
-RECORDER.info_text("Done:\t%s regions analyzed\n\t\t%s regions off-disk\n\t\t%s regions too small\n\t\t%s regions unipolar" % (NUM_LOOPS, NUM_OFF_DISK, NUM_SMALL, NUM_UNIPOLAR))
+RECORDER.close()
+RECORDER.info_text("Done:\t%s regions analyzed\n\t\t%s regions off-disk\n\t\t%s regions too small" % (NUM_LOOPS, NUM_OFF_DISK, NUM_SMALL))
 RECORDER.line()
 RECORDER.display_end_time("loop-analysis")
@@ -1,47 +1,59 @@
 import warnings
 warnings.filterwarnings("ignore", message = "numpy.dtype size changed")
 
+from align import align_catalog
 from astropy.coordinates import SkyCoord
+from boxstats import BoxStats
+from catalog import Catalog
 from datetime import datetime
+from disk import disk_geometry, on_disk
+from hmialign import HMIAligner
 from IPython.core import debugger; debug = debugger.Pdb().set_trace
-from matplotlib.path import Path
-from recorder import Recorder
-from scipy.ndimage import zoom as interpolate
+from lazymap import LazyMapSequence
+from masks import fit_ellipse, MASKING, region_mask
+from multiprocessing import Pool
+from peaks import find_maxima
+from recorder import COLUMNS, Recorder, TRACK_COLUMNS
 from scipy.ndimage.measurements import center_of_mass as com
-from scipy.spatial import distance
-from skimage import measure
+from timeit import default_timer as timer
+from tracker import KEYFRAME_INTERVAL, MATCHING, Tracker
+import argparse
 import astropy.units as u
 import cv2 as cv
 import getpass
 import matplotlib.pyplot as plt
 import numpy as np
-import os
-import scipy.ndimage as ndimage
-import scipy.ndimage.filters as filters
-import sunpy.map as smap
 
 ##### initial setup
 
 MAIN_DIR = "/Users/%s/Desktop/lmsal" % getpass.getuser()
-RECORDER = Recorder("database.csv")
+ARCHIVE = "%s/resources/data_%s.tar" % (MAIN_DIR, datetime.now().strftime("%Y-%m-%d_%H.%M.%S"))
+RECORDER = Recorder("database.csv", archive = ARCHIVE, columns = COLUMNS + TRACK_COLUMNS)
 RECORDER.display_start_time("region-analysis")
 
-os.system("rm -rf resources/region-data/raw-images && mkdir resources/region-data/raw-images")
-os.system("rm -rf resources/region-data/r-masked-images && mkdir resources/region-data/r-masked-images")
-os.system("rm -rf resources/region-data/e-masked-images && mkdir resources/region-data/e-masked-images")
-os.system("rm -rf resources/region-data/c-masked-images && mkdir resources/region-data/c-masked-images")
+parser = argparse.ArgumentParser()
+parser.add_argument("--masking", choices = sorted(MASKING), default = "contour")
+parser.add_argument("--processes", type = int, default = None)
+parser.add_argument("--keyframes", type = int, default = KEYFRAME_INTERVAL) # 1 fits masks in every frame
+parser.add_argument("--matching", choices = sorted(MATCHING), default = "hungarian")
+args = parser.parse_args()
 
 ##### import data
 
+CATALOG = Catalog()
+RECORDER.info_text("%d new files indexed" % CATALOG.scan(["/Volumes/Nicholas Data/AIA171/", "/Volumes/Nicholas Data/AIA304/", "/Volumes/Nicholas Data/HMI/"]))
+# RECORDER.info_text("%d new files indexed" % CATALOG.scan(["%s/resources/aia-fits-files/" % MAIN_DIR, "%s/resources/hmi-fits-files/" % MAIN_DIR]))
+ALIGNMENT = align_catalog(CATALOG, ["AIA171", "AIA304", "HMI"])
+for line in ALIGNMENT.report():
+	RECORDER.info_text(line)
+FILES = ALIGNMENT.columns()
+
 RECORDER.info_text("Importing AIA171 data")
-MAPCUBE_AIA_171 = smap.Map("/Volumes/Nicholas Data/AIA171/*.fits", sequence = True)
-# MAPCUBE_AIA_171 = smap.Map("%s/resources/aia-fits-files/*.171.image_lev1.fits" % MAIN_DIR, sequence = True)
+MAPCUBE_AIA_171 = LazyMapSequence(FILES["AIA171"])
 RECORDER.info_text("Importing AIA304 data")
-MAPCUBE_AIA_304 = smap.Map("/Volumes/Nicholas Data/AIA304/*.fits", sequence = True)
-# MAPCUBE_AIA_304 = smap.Map("%s/resources/aia-fits-files/*.304.image_lev1.fits" % MAIN_DIR, sequence = True)
+MAPCUBE_AIA_304 = LazyMapSequence(FILES["AIA304"])
 RECORDER.info_text("Importing HMI magnetogram data\n")
-MAPCUBE_HMI = smap.Map("/Volumes/Nicholas Data/HMI/*.fits", sequence = True)
-# MAPCUBE_HMI = smap.Map("%s/resources/hmi-fits-files/*.fits" % MAIN_DIR, sequence = True)
+MAPCUBE_HMI = LazyMapSequence(FILES["HMI"])
 
 ##### prepare mapcube
 
@@ -53,109 +65,98 @@ DATA = {
 
 N = len(DATA["AIA171"])
 
+HMI_ALIGNER = HMIAligner(fill = np.nan)
+
 ##### helper variables
 
-LOOP_ID = 1
-NUM_LOOPS = 0
+FRAME = Recorder(deferred = True) # per-process; workers record regions without IDs
 
-ADD_OFFDISK = False
-NUM_OFF_DISK = 0
+##### find the bright regions of one frame
 
-ADD_SMALL = False
-NUM_SMALL = 0
+def detect_frame(i):
+	# (on-disk maxima, their helioprojective coordinates, box half-widths, box means, time, off-disk count)
 
-##### find and store bright regions
+	RAW_AIA = DATA["AIA304"][i].data
+	RAW_AIA_171 = DATA["AIA171"][i].data
 
-REGIONS = []
-REGIONS_HPC = []
+	MIN_DISTANCE = 1000
+	MIN_VALUE = 0.6 * RAW_AIA_171.max()
 
-for i in range(N):
+	# same maxima as maximum_filter / minimum_filter over MIN_DISTANCE, from a block-reduced frame
+	xy_maxima = find_maxima(RAW_AIA_171, MIN_DISTANCE, MIN_VALUE)
 
-	RAW = DATA["AIA171"][i].data
+	##### algorithm to eliminate regions far from solar center, for every maximum at once
 
-	MIN_DISTANCE = 1000
-	MIN_VALUE = 0.6 * RAW.max()
+	OFF_DISK_THRESHOLD = 50.0
 
-	max = filters.maximum_filter(RAW,
-								 MIN_DISTANCE)
-	temp = (RAW == max)
-	min = filters.minimum_filter(RAW,
-								 MIN_DISTANCE)
-	diff = ((max - min) > MIN_VALUE)
-	temp[diff == 0] = 0
+	center, radius = disk_geometry(DATA["AIA304"][i])
+	ON_DISK = on_disk(xy_maxima, center, radius, OFF_DISK_THRESHOLD)
+	num_off_disk = len(xy_maxima) - np.count_nonzero(ON_DISK)
+	if num_off_disk > 0:
+		FRAME.warn_text("%d off-disk region(s) skipped" % num_off_disk)
+	xy_maxima = xy_maxima[ON_DISK]
 
-	labeled, num_objects = ndimage.label(temp)
-	xy_maxima = np.array(ndimage.center_of_mass(RAW,
-												labeled,
-												range(1, num_objects + 1)))
+	if len(xy_maxima) == 0:
+		return xy_maxima, None, [], [], DATA["AIA304"][i].date, num_off_disk
 
-	xy_maxima = xy_maxima.astype(int)
-	REGIONS.append(xy_maxima)
+	REGIONS_HPC = DATA["AIA171"][i].pixel_to_world(xy_maxima[:, 1] * u.pixel,
+												   xy_maxima[:, 0] * u.pixel)
 
-	if xy_maxima.shape[0] == 0:
-		REGIONS_HPC.append(np.array([]))
+	# region bounds for the whole frame from one summed-area table; the box means are the
+	# cheap brightness the tracker compares between keyframes
+	AVERAGE_BRIGHTNESS_THRESHOLD = 200.0
+	STATS = BoxStats(RAW_AIA)
+	SIZES = STATS.grow(xy_maxima, AVERAGE_BRIGHTNESS_THRESHOLD)
+	MEANS = STATS.mean(xy_maxima[:, 0] - SIZES, xy_maxima[:, 0] + SIZES,
+					   xy_maxima[:, 1] - SIZES, xy_maxima[:, 1] + SIZES)
 
-	else:
-		REGIONS_HPC.append(DATA["AIA171"][i].pixel_to_world(xy_maxima[:, 1] * u.pixel,
-															xy_maxima[:, 0] * u.pixel))
+	return xy_maxima, REGIONS_HPC, SIZES, MEANS, DATA["AIA304"][i].date, num_off_disk
+
+##### analyze and record the bright regions of one frame
+
+def analyze_frame(job):
+	# (committed entries, too-small count, masking time) for (frame, detection, (tracks, keyframes));
+	# IDs are assigned by the caller. Masks are fitted only at a region's keyframes; between them
+	# the statistics come straight from the binary masks
 
-##### analyze bright region
+	i, (xy_maxima, REGIONS_HPC, SIZES, MEANS, _, _), (TRACKS, KEYFRAMES) = job
 
-for i in range(N):
+	num_small = 0
+	mask_time = 0.
 
 	RAW_AIA = DATA["AIA304"][i].data
 	RAW_AIA_171 = DATA["AIA171"][i].data
-	RAW_HMI = DATA["HMI"][i].data
 
-	M = len(REGIONS[i])
-
-	for j in range(M):
+	for j in range(len(xy_maxima)):
 
 		##### basic information about data point
 
 		PRODUCT = "AIA304"
 
-		RECORDER.show_instr(PRODUCT)
-		RECORDER.write_ID(LOOP_ID)
+		FRAME.show_instr(PRODUCT)
+		FRAME.begin()
+		FRAME.info_text("Frame %d, region %d, track %d" % (i, j, TRACKS[j]))
 
 		when = DATA[PRODUCT][i].date
-		RECORDER.write_datetime(when)
-
-		xy = REGIONS[i][j]
-		RECORDER.write_xywhere(xy)
-
-		center = np.array([int(DATA[PRODUCT][i].reference_pixel[0].value),
-						   int(DATA[PRODUCT][i].reference_pixel[1].value)])
-		radius = (DATA[PRODUCT][i].rsun_obs / DATA[PRODUCT][i].scale[0]).value
+		FRAME.write_datetime(when)
 
-		##### algorithm to eliminate regions far from solar center
+		xy = xy_maxima[j]
+		FRAME.write_xywhere(xy)
 
-		OFF_DISK_THRESHOLD = 50.0
-
-		if distance.euclidean(center, xy) >= (radius - OFF_DISK_THRESHOLD):
-			RECORDER.off_disk()
-			NUM_OFF_DISK += 1
-			continue
-
-		hpc = REGIONS_HPC[i][j]
-		RECORDER.write_hpcwhere(hpc)
+		hpc = REGIONS_HPC[j]
+		FRAME.write_hpcwhere(hpc)
 
 		##### algorithm to determine bounds of region
-		RECORDER.info_text("Finding optimal region bounds...")
-
-		AVERAGE_BRIGHTNESS_THRESHOLD = 200.0
-		HALF_DIM_PXL = 1
+		FRAME.info_text("Finding optimal region bounds...")
 
-		while np.average(RAW_AIA[xy[0] - HALF_DIM_PXL : xy[0] + HALF_DIM_PXL,
-								 xy[1] - HALF_DIM_PXL: xy[1] + HALF_DIM_PXL]) > AVERAGE_BRIGHTNESS_THRESHOLD:
-			HALF_DIM_PXL += 1
+		HALF_DIM_PXL = int(SIZES[j])
 
 		if HALF_DIM_PXL < 50.0:
-			RECORDER.too_small()
-			NUM_SMALL += 1
+			FRAME.too_small()
+			num_small += 1
 			continue
 
-		RECORDER.write_xysize(HALF_DIM_PXL * 2.0)
+		FRAME.write_xysize(HALF_DIM_PXL * 2.0)
 
 		##### converts pixel coordinates to helioprojective coordinates
 
@@ -169,7 +170,7 @@ for i in range(N):
 					  hpc.Ty + HALF_DIM_HPC * u.arcsec,
 					  frame = DATA[PRODUCT][i].coordinate_frame)
 
-		RECORDER.write_hpcsize(bl, tr)
+		FRAME.write_hpcsize(bl, tr)
 
 		cut_aia = RAW_AIA[xy[0] - HALF_DIM_PXL : xy[0] + HALF_DIM_PXL,
 						  xy[1] - HALF_DIM_PXL: xy[1] + HALF_DIM_PXL]
@@ -177,20 +178,20 @@ for i in range(N):
 		cut_aia_171 = RAW_AIA_171[xy[0] - HALF_DIM_PXL : xy[0] + HALF_DIM_PXL,
 								  xy[1] - HALF_DIM_PXL: xy[1] + HALF_DIM_PXL]
 
-		RECORDER.write_image(0,
-							 LOOP_ID,
-							 cut_aia,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
+		FRAME.write_image(0,
+						  None,
+						  cut_aia,
+						  DATA[PRODUCT][i].detector,
+						  DATA[PRODUCT][i].wavelength)
 
-		RECORDER.write_image(0,
-							 LOOP_ID,
-							 cut_aia_171,
-							 DATA["AIA171"][i].detector,
-							 DATA["AIA171"][i].wavelength)
+		FRAME.write_image(0,
+						  None,
+						  cut_aia_171,
+						  DATA["AIA171"][i].detector,
+						  DATA["AIA171"][i].wavelength)
 
 		##### grows a binary mask based on the threshold
-		RECORDER.info_text("Growing binary mask...")
+		FRAME.info_text("Growing binary mask...")
 
 		LOW_BRIGHTNESS_THRESHOLD = 450
 
@@ -201,140 +202,83 @@ for i in range(N):
 						   iterations = 1)
 
 		##### applies binary mask to AIA304 data
-		RECORDER.info_text("Applying binary mask to AIA304 data...")
+		FRAME.info_text("Applying binary mask to AIA304 data...")
 
 		masked_aia_data = cut_aia * r_mask
 
-		RECORDER.write_image(1,
-							 LOOP_ID,
-							 masked_aia_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
-
-		##### initial setup for elliptical mask fit
-		RECORDER.info_text("Preparing for elliptical mask fit...")
-
-		center = com(r_mask)
-		x_center = int(center[0] + 0.5)
-		y_center = int(center[1] + 0.5)
-		dim = cut_aia.shape[0]
-		threshold_percent_1 = 1.0
-		threshold_percent_2 = 0.97
-		threshold_percent_3 = 0.94
-
-		total = float(len(np.where(r_mask == 1)[0]))
-		rad = 2.0
-		y, x = np.ogrid[-x_center:dim - x_center, -y_center:dim - y_center]
-		mask_in = None
-		mask_out = None
-
-		##### fits circle to 100% of the data
-		RECORDER.info_text("Fitting elliptical mask to binary AIA304 data...")
-
-		while True:
-			temp_in = x**2 + y**2 <= rad**2
-			if len(np.where(r_mask * temp_in == 1)[0]) / total >= threshold_percent_1:
-				mask_in = temp_in
-				break
-			rad += 1.0
-
-		##### adjusts horizontal axis of ellipse to fit 95% of the data
-		RECORDER.info_text("Adjusting horizontal axis...")
-
-		a = b = rad
-
-		while True:
-			temp_in = x**2/a**2 + y**2/b**2 <= 1
-			if len(np.where(r_mask * temp_in == 1)[0]) / total < threshold_percent_2:
-				mask_in = temp_in
-				break
-			a -= 1.0
-
-		##### adjusts vertical axis of ellipse to fit 90% of the data
-		RECORDER.info_text("Adjusting vertical axis...")
-
-		while True:
-			temp_in = x**2/a**2 + y**2/b**2 <= 1
-			temp_out = x**2/a**2 + y**2/b**2 > 1
-			if len(np.where(r_mask * temp_in == 1)[0]) / total < threshold_percent_3:
-				mask_in = temp_in
-				mask_out = temp_out
-				break
-			b -= 1.0
-
-		##### applies elliptical binary mask to data
-		RECORDER.info_text("Applying elliptical mask to AIA304 data...")
-
-		e_masked_aia_data = (cut_aia * e_mask).astype(float)
-		e_masked_aia_data[mask_out] = np.nan
-
-		RECORDER.write_image(2,
-							 LOOP_ID,
-							 e_masked_aia_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
-
-		##### calculates contour-fit binary mask from elliptical mask
-		RECORDER.info_text("Fitting contour mask to elliptical mask...")
-
-		contours = np.array(measure.find_contours(e_mask, 0.5))
-
-		L = len(contours)
-		max_area = 0.0
-		max_index = 0
-
-		for i in range(L):
-			n = len(contours[i])
-			area = 0.0
-			for j in range(n):
-				k = (j + 1) % n
-				area += contours[i][j][0] * contours[i][k][1]
-				area -= contours[i][k][0] * contours[i][j][1]
-			area = abs(area) / 2.0
-			if area > max_area:
-				max_area = area
-				max_index = i
-
-		contour = np.array([contours[max_index]])
-
-		x_dim = e_masked_aia_data.shape[0]
-		y_dim = e_masked_aia_data.shape[1]
-
-		x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-		x, y = x.flatten(), y.flatten()
-
-		points = np.vstack((x,y)).T
-
-		vertices = contour[0]
-		path = Path(vertices)
-		c_mask = path.contains_points(points)
-		c_mask = np.rot90(np.flip(c_mask.reshape((y_dim,x_dim)), 1))
-
-		c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
-
-		##### applies contour mask to data
-		RECORDER.info_text("Applying contour mask to AIA304 data...")
-
-		c_masked_aia_data = (e_masked_aia_data * c_mask).astype(float)
-
-		RECORDER.write_image(3,
-							 LOOP_ID,
-							 c_masked_aia_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
-
-		##### takes statistics for c-masked AIA304 data
-		RECORDER.info_text("Recording statistics for contour-masked AIA304 data...")
+		FRAME.write_image(1,
+						  None,
+						  masked_aia_data,
+						  DATA[PRODUCT][i].detector,
+						  DATA[PRODUCT][i].wavelength)
+
+		if KEYFRAMES[j]:
+			##### initial setup for elliptical mask fit
+			FRAME.info_text("Preparing for elliptical mask fit...")
+
+			center = com(r_mask)
+			x_center = int(center[0] + 0.5)
+			y_center = int(center[1] + 0.5)
+			threshold_percent_1 = 1.0
+			threshold_percent_2 = 0.97
+			threshold_percent_3 = 0.94
+
+			##### fits circle to 100% of the data, then shrinks the horizontal and vertical axes
+			FRAME.info_text("Fitting elliptical mask to binary AIA304 data...")
+
+			mask_in, mask_out, a, b = fit_ellipse(r_mask, (x_center, y_center),
+												  (threshold_percent_1, threshold_percent_2, threshold_percent_3))
+			e_mask = r_mask * mask_in
+
+			##### applies elliptical binary mask to data
+			FRAME.info_text("Applying elliptical mask to AIA304 data...")
+
+			e_masked_aia_data = (cut_aia * e_mask).astype(float)
+			e_masked_aia_data[mask_out] = np.nan
+
+			FRAME.write_image(2,
+							  None,
+							  e_masked_aia_data,
+							  DATA[PRODUCT][i].detector,
+							  DATA[PRODUCT][i].wavelength)
+
+			##### calculates contour-fit binary mask from elliptical mask
+			FRAME.info_text("Fitting %s mask to elliptical mask..." % args.masking)
+
+			start = timer()
+			c_mask = region_mask(e_mask, 1, args.masking, cut_aia)
+			mask_time += timer() - start
+
+			c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
 
-		temp_threshold_data = c_masked_aia_data[np.where(c_masked_aia_data > LOW_BRIGHTNESS_THRESHOLD)]
+			##### applies contour mask to data
+			FRAME.info_text("Applying contour mask to AIA304 data...")
+
+			c_masked_aia_data = (e_masked_aia_data * c_mask).astype(float)
+
+			FRAME.write_image(3,
+							  None,
+							  c_masked_aia_data,
+							  DATA[PRODUCT][i].detector,
+							  DATA[PRODUCT][i].wavelength)
+
+			region = np.logical_and(e_mask * c_mask > 0, np.logical_not(mask_out))
+		else:
+			##### between keyframes: the binary mask is the region
+			region = r_mask > 0
+
+		##### takes statistics over the region's AIA304 pixels
+		FRAME.info_text("Recording statistics for masked AIA304 data...")
+
+		temp_threshold_data = cut_aia[np.logical_and(region, cut_aia > LOW_BRIGHTNESS_THRESHOLD)]
 		average_intensity = np.average(temp_threshold_data)
 		median_intensity = np.median(temp_threshold_data)
 		maximum_intensity = np.max(temp_threshold_data)
 
-		RECORDER.write_inten(LOW_BRIGHTNESS_THRESHOLD,
-							 average_intensity,
-							 median_intensity,
-							 maximum_intensity)
+		FRAME.write_inten(LOW_BRIGHTNESS_THRESHOLD,
+						  average_intensity,
+						  median_intensity,
+						  maximum_intensity)
 
 
 		""""""
@@ -345,42 +289,26 @@ for i in range(N):
 
 
 		##### aligns HMI data to AIA304 data with interpolation and casting
-		RECORDER.info_text("Aligning HMI data to AIA304 data...")
+		FRAME.info_text("Aligning HMI data to AIA304 data...")
 
 		PRODUCT = "HMI"
 
-		ALIGNED_RAW_HMI = np.zeros((4096, 4096)).astype(float)
-		ALIGNED_RAW_HMI[ALIGNED_RAW_HMI == 0] = np.nan
-		scale = (DATA[PRODUCT][i].scale[0] / DATA["AIA304"][i].scale[0]).value
-		scale = float("%.3f" % scale)
-
-		RECORDER.info_text("Interpolating HMI data with %.6f scale factor..." % scale)
-		interpolated_hmi_data = interpolate(RAW_HMI,
-											scale,
-											order = 1)
-		interpolated_hmi_data = np.flip(interpolated_hmi_data,
-										(0,1))
-
-		x_size = interpolated_hmi_data.shape[1]
-		y_size = interpolated_hmi_data.shape[0]
 		x_center = int(DATA["AIA304"][i].reference_pixel.y.value + 0.5)
 		y_center = int(DATA["AIA304"][i].reference_pixel.x.value + 0.5)
 
-		RECORDER.info_text("Casting interpolated HMI data to 4k by 4k empty image...")
-		ALIGNED_RAW_HMI[(y_center - 1 - y_size / 2) : (y_center + y_size / 2),
-						(x_center - 1 - x_size / 2) : (x_center + x_size / 2)] = interpolated_hmi_data
+		# resamples only the cutout instead of the full 4096 x 4096 canvas
+		cut_hmi = HMI_ALIGNER.window(DATA[PRODUCT][i], DATA["AIA304"][i], (y_center, x_center),
+									 (xy[0] - HALF_DIM_PXL, xy[0] + HALF_DIM_PXL),
+									 (xy[1] - HALF_DIM_PXL, xy[1] + HALF_DIM_PXL))
 
-		cut_hmi = ALIGNED_RAW_HMI[xy[0] - HALF_DIM_PXL : xy[0] + HALF_DIM_PXL,
-								  xy[1] - HALF_DIM_PXL: xy[1] + HALF_DIM_PXL]
-
-		RECORDER.write_image(0,
-							 LOOP_ID,
-							 cut_hmi,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
+		FRAME.write_image(0,
+						  None,
+						  cut_hmi,
+						  DATA[PRODUCT][i].detector,
+						  DATA[PRODUCT][i].wavelength)
 
 		##### grows a binary mask for HMI data
-		RECORDER.info_text("Growing binary mask...")
+		FRAME.info_text("Growing binary mask...")
 
 		POS_GAUSS_THRESHOLD = 125
 		NEG_GAUSS_THRESHOLD = POS_GAUSS_THRESHOLD * -1
@@ -393,177 +321,139 @@ for i in range(N):
 		r_mask = cv.morphologyEx(r_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
 		r_mask = cv.dilate(r_mask, np.ones((3,3)).astype(bool).astype(int), iterations = 1)
 
-		RECORDER.info_text("Applying binary mask to HMI data...")
+		FRAME.info_text("Applying binary mask to HMI data...")
 
 		masked_hmi_data = cut_hmi * r_mask
 
-		RECORDER.write_image(1,
-							 LOOP_ID,
-							 masked_hmi_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
-
-		##### grows an elliptical binary mask for HMI data
-		RECORDER.info_text("Fitting elliptical mask to HMI data...")
-
-		center = com(r_mask)
-		x_center = int(center[0] + 0.5)
-		y_center = int(center[1] + 0.5)
-		dim = cut_hmi.shape[0]
-		threshold_percent_1 = 1.0
-		threshold_percent_2 = 0.94
-		threshold_percent_3 = 0.88
-
-		total = float(len(np.where(r_mask == 1)[0]))
-		rad = 2.0
-		y, x = np.ogrid[-x_center:dim - x_center, -y_center:dim - y_center]
-		mask_in = None
-		mask_out = None
-
-
-		while True:
-			temp_in = x**2 + y**2 <= rad**2
-			if len(np.where(r_mask * temp_in == 1)[0]) / total >= threshold_percent_1:
-				mask_in = temp_in
-				break
-			rad += 1.0
-
-		##### adjusts horizontal axis of ellipse
-		a = b = rad
-
-		RECORDER.info_text("Adjusting horizontal axis...")
-		while True:
-			temp_in = x**2/a**2 + y**2/b**2 <= 1
-			if len(np.where(r_mask * temp_in == 1)[0]) / total < threshold_percent_2:
-				mask_in = temp_in
-				break
-			a -= 1.0
-
-		##### adjusts vertical axis of ellipse
-		RECORDER.info_text("Adjusting vertical axis...")
-		while True:
-			temp_in = x**2/a**2 + y**2/b**2 <= 1
-			temp_out = x**2/a**2 + y**2/b**2 > 1
-			if len(np.where(r_mask * temp_in == 1)[0]) / total < threshold_percent_3:
-				mask_in = temp_in
-				mask_out = temp_out
-				break
-			b -= 1.0
-
-		##### applies elliptical binary mask
-		RECORDER.info_text("Applying elliptical mask to HMI data...")
-
-		e_mask = r_mask * mask_in
-
-		e_masked_hmi_data = cut_hmi * e_mask
-		e_masked_hmi_data[mask_out] = np.nan
-
-		RECORDER.write_image(2,
-							 LOOP_ID,
-							 e_masked_hmi_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
-
-		##### contour mask
-
-		RECORDER.info_text("Fitting contour mask to elliptical mask...")
-
-		contours = np.array(measure.find_contours(e_mask, 0.5))
-
-		L = len(contours)
-		max_area = 0.0
-		max_index = 0
-
-		for i in range(L):
-			n = len(contours[i])
-			area = 0.0
-			for j in range(n):
-				k = (j + 1) % n
-				area += contours[i][j][0] * contours[i][k][1]
-				area -= contours[i][k][0] * contours[i][j][1]
-			area = abs(area) / 2.0
-			if area > max_area:
-				max_area = area
-				max_index = i
-
-		second_max_area = 0.0
-		second_max_index = 0
-
-		for i in range(L):
-			n = len(contours[i])
-			area = 0.0
-			for j in range(n):
-				k = (j + 1) % n
-				area += contours[i][j][0] * contours[i][k][1]
-				area -= contours[i][k][0] * contours[i][j][1]
-			area = abs(area) / 2.0
-			if area > second_max_area and area < max_area:
-				second_max_area = area
-				second_max_index = i
-
-		contour1 = np.array([contours[max_index]])
-		contour2 = np.array([contours[second_max_index]])
-
-		x_dim = e_mask.shape[0]
-		y_dim = e_mask.shape[1]
-
-		x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-		x, y = x.flatten(), y.flatten()
-
-		points = np.vstack((x,y)).T
+		FRAME.write_image(1,
+						  None,
+						  masked_hmi_data,
+						  DATA[PRODUCT][i].detector,
+						  DATA[PRODUCT][i].wavelength)
+
+		if KEYFRAMES[j]:
+			##### grows an elliptical binary mask for HMI data
+			FRAME.info_text("Fitting elliptical mask to HMI data...")
+
+			center = com(r_mask)
+			x_center = int(center[0] + 0.5)
+			y_center = int(center[1] + 0.5)
+			threshold_percent_1 = 1.0
+			threshold_percent_2 = 0.94
+			threshold_percent_3 = 0.88
+
+			mask_in, mask_out, a, b = fit_ellipse(r_mask, (x_center, y_center),
+												  (threshold_percent_1, threshold_percent_2, threshold_percent_3))
+
+			##### applies elliptical binary mask
+			FRAME.info_text("Applying elliptical mask to HMI data...")
+
+			e_mask = r_mask * mask_in
+
+			e_masked_hmi_data = cut_hmi * e_mask
+			e_masked_hmi_data[mask_out] = np.nan
 
-		vertices1 = contour1[0]
-		vertices2 = contour2[0]
+			FRAME.write_image(2,
+							  None,
+							  e_masked_hmi_data,
+							  DATA[PRODUCT][i].detector,
+							  DATA[PRODUCT][i].wavelength)
 
-		path1 = Path(vertices1)
-		path2 = Path(vertices2)
+			##### contour mask
 
-		c_mask1 = path1.contains_points(points)
-		c_mask1 = np.rot90(np.flip(c_mask1.reshape((y_dim,x_dim)), 1))
+			FRAME.info_text("Fitting %s mask to elliptical mask..." % args.masking)
 
-		c_mask2 = path2.contains_points(points)
-		c_mask2 = np.rot90(np.flip(c_mask2.reshape((y_dim,x_dim)), 1))
+			start = timer()
+			c_mask = region_mask(e_mask, 2, args.masking, cut_hmi).astype(float)
+			mask_time += timer() - start
 
-		c_mask = c_mask1.astype(float) + c_mask2.astype(float)
-		c_mask[c_mask == 2.] = 1.
+			c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
 
-		c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
+			FRAME.info_text("Applying contour mask to AIA304 data...")
 
-		RECORDER.info_text("Applying contour mask to AIA304 data...")
+			c_masked_hmi_data = e_masked_hmi_data * c_mask
 
-		c_masked_hmi_data = e_masked_hmi_data * c_mask
+			FRAME.write_image(3,
+							  None,
+							  c_masked_hmi_data,
+							  DATA[PRODUCT][i].detector,
+							  DATA[PRODUCT][i].wavelength)
 
-		RECORDER.write_image(3,
-							 LOOP_ID,
-							 c_masked_hmi_data,
-							 DATA[PRODUCT][i].detector,
-							 DATA[PRODUCT][i].wavelength)
+			region = np.logical_and(e_mask * c_mask > 0, np.logical_not(mask_out))
+		else:
+			##### between keyframes: the binary mask is the region
+			region = r_mask > 0
 
-		##### takes a few statistics for masked HMI data
-		RECORDER.info_text("Recording statistics for masked HMI data...")
+		##### takes a few statistics over the region's HMI pixels, so keyframe and tracked rows
+		##### measure the same quantity
+		FRAME.info_text("Recording statistics for masked HMI data...")
 
-		temp_threshold_data = np.ma.array(c_masked_hmi_data,
-										  mask = np.isnan(c_masked_hmi_data))
+		temp_threshold_data = cut_hmi[np.logical_and(region, np.isfinite(cut_hmi))]
 
 		unsig_gauss = np.sum(np.abs(temp_threshold_data))
 		average_gauss = np.average(temp_threshold_data)
 		median_gauss = np.median(temp_threshold_data)
 
-		RECORDER.write_gauss(unsig_gauss,
-							 average_gauss,
-							 median_gauss)
+		FRAME.write_gauss(unsig_gauss,
+						  average_gauss,
+						  median_gauss)
 
-		RECORDER.new_line()
+		FRAME.write_track(TRACKS[j], KEYFRAMES[j])
+
+		FRAME.commit()
+
+	return FRAME.take(), num_small, mask_time
+
+def frames(work, jobs, processes = None):
+	# work over every job, in order, from a process pool unless processes == 1
+	if processes == 1:
+		for job in jobs:
+			yield work(job)
+		return
+
+	pool = Pool(processes)
+	try:
+		for result in pool.imap(work, jobs):
+			yield result
+	finally:
+		pool.close()
+		pool.join()
+
+##### detect every frame, then link the detections across frames in time order
+
+DETECTIONS = list(frames(detect_frame, range(N), args.processes))
+
+TRACKER = Tracker(keyframes = args.keyframes, matching = args.matching)
+PLANS = []
+for xy_maxima, REGIONS_HPC, SIZES, MEANS, when, _ in DETECTIONS:
+	# every frame advances the tracker, empty ones too, so --keyframes and the track gap count real frames
+	if len(xy_maxima) == 0:
+		PLANS.append(TRACKER.update(when, np.zeros(0), np.zeros(0), SIZES, MEANS))
+	else:
+		PLANS.append(TRACKER.update(when, REGIONS_HPC.Tx.value, REGIONS_HPC.Ty.value, SIZES, MEANS))
+
+NUM_KEYFRAMES = sum(sum(keyframes) for tracks, keyframes in PLANS)
+RECORDER.info_text("%d detections in %d tracks; %d keyframes" % (sum(len(tracks) for tracks, keyframes in PLANS),
+																TRACKER.next_id - 1, NUM_KEYFRAMES))
+
+##### merge frames as they finish; IDs run in (time, region) order whatever the worker count
+
+LOOP_ID = 1
+NUM_LOOPS = 0
+NUM_OFF_DISK = sum(detection[-1] for detection in DETECTIONS)
+NUM_SMALL = 0
+MASK_TIME = 0.
 
-		NUM_LOOPS += 1
-		LOOP_ID += 1
+for entries, num_small, mask_time in frames(analyze_frame, zip(range(N), DETECTIONS, PLANS), args.processes):
+	LOOP_ID = RECORDER.merge(entries, LOOP_ID)
+	NUM_LOOPS += len(entries)
+	NUM_SMALL += num_small
+	MASK_TIME += mask_time
 
 RECORDER.remove_duplicates()
 
-RECORDER.info_text("Compressing database\n")
-os.chdir("resources/")
-os.system("zip -r -X data_%s.zip region-data" % str(datetime.now().strftime("%Y-%m-%d_%H.%M.%S")))
-os.chdir("../")
+RECORDER.close()
 RECORDER.info_text("Done:\t%s regions analyzed\n\t\t%s regions off-disk\n\t\t%s regions too small" % (NUM_LOOPS, NUM_OFF_DISK, NUM_SMALL))
+RECORDER.info_text("%s masking took %.2f s" % (args.masking, MASK_TIME))
 RECORDER.line()
 RECORDER.display_end_time("loop-analysis")
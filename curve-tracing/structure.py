@@ -7,11 +7,13 @@ warnings.filterwarnings("ignore", message = "invalid value encountered in log")
 warnings.filterwarnings("ignore", message = "invalid value encountered in multiply")
 warnings.filterwarnings("ignore", message = "numpy.dtype size changed")
 
+from align import align_catalog
+from cache import ProductCache
+from catalog import Catalog
+from channels import AIA_CHANNELS, CHANNELS, run_channels
 from IPython.core import debugger; debug = debugger.Pdb().set_trace
 from matplotlib.colors import LogNorm
 from matplotlib.path import Path
-from os import listdir
-from os.path import isfile, join
 from PIL import Image, ImageEnhance
 from recorder import Recorder
 from scipy import ndimage
@@ -28,60 +30,44 @@ import imageio
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import shutil
 
 RECORDER = Recorder()
 RECORDER.display_start_time("structure")
 
+STRUCTURE_CHANNELS = ["AIA131", "AIA171", "AIA193", "AIA211", "AIA304", "AIA335", "HMI"]
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--cleardirs", nargs = "?", const = True, type = bool)
+parser.add_argument("--clearcache", nargs = "?", const = True, type = bool)
+parser.add_argument("--nocache", nargs = "?", const = True, type = bool)
+parser.add_argument("--channels", nargs = "+", choices = STRUCTURE_CHANNELS, default = STRUCTURE_CHANNELS) # channels with structure parameters
+parser.add_argument("--processes", type = int, default = None)
 args = parser.parse_args()
 
 RECORDER.sys_text("Importing data directories")
 SAVEPATH = "data/outputs/"
-PATH131 = "data/AIA131/"; PATH171 = "data/AIA171/"; PATH193 = "data/AIA193/"; PATH211 = "data/AIA211/"; PATH304 = "data/AIA304/"; PATH335 = "data/AIA335/"; PATHHMI = "data/HMI/"
-
-DIR131 = [f for f in listdir(PATH131) if isfile(join(PATH131, f))]; DIR131.sort()
-DIR171 = [f for f in listdir(PATH171) if isfile(join(PATH171, f))]; DIR171.sort()
-DIR193 = [f for f in listdir(PATH193) if isfile(join(PATH193, f))]; DIR193.sort()
-DIR211 = [f for f in listdir(PATH211) if isfile(join(PATH211, f))]; DIR211.sort()
-DIR304 = [f for f in listdir(PATH304) if isfile(join(PATH304, f))]; DIR304.sort()
-DIR335 = [f for f in listdir(PATH335) if isfile(join(PATH335, f))]; DIR335.sort()
-DIRHMI = [f for f in listdir(PATHHMI) if isfile(join(PATHHMI, f))]; DIRHMI.sort()
-
-if DIR131[0] == ".DS_Store":
-	DIR131 = DIR131[1:]
-if DIR171[0] == ".DS_Store":
-	DIR171 = DIR171[1:]
-if DIR193[0] == ".DS_Store":
-	DIR193 = DIR193[1:]
-if DIR211[0] == ".DS_Store":
-	DIR211 = DIR211[1:]
-if DIR304[0] == ".DS_Store":
-	DIR304 = DIR304[1:]
-if DIR335[0] == ".DS_Store":
-	DIR335 = DIR335[1:]
-if DIRHMI[0] == ".DS_Store":
-	DIRHMI = DIRHMI[1:]
-
-K131 = []; t131 = []
-K171 = []; t171 = []
-K193 = []; t193 = []
-K211 = []; t211 = []
-K304 = []; t304 = []
-K335 = []; t335 = []
-KHMI = []
+NAMES = args.channels
+AIA_NAMES = [name for name in NAMES if name in AIA_CHANNELS]
+CATALOG = Catalog()
+RECORDER.info_text("%d new files indexed" % CATALOG.scan([CHANNELS[name]["path"] for name in NAMES]))
+ALIGNMENT = align_catalog(CATALOG, NAMES, reference = "AIA171" if "AIA171" in NAMES else NAMES[0])
+for line in ALIGNMENT.report():
+	RECORDER.info_text(line)
+DIRS = ALIGNMENT.columns()
 
 if args.cleardirs:
 	RECORDER.sys_text("Clearing image directories")
-	os.system("rm %sraw/AIA131/*" % SAVEPATH); os.system("rm %senhanced/AIA131/*" % SAVEPATH); os.system("rm %sedge/AIA131/*" % SAVEPATH); os.system("rm %sbinary/AIA131/*" % SAVEPATH)
-	os.system("rm %sraw/AIA171/*" % SAVEPATH); os.system("rm %senhanced/AIA171/*" % SAVEPATH); os.system("rm %sedge/AIA171/*" % SAVEPATH); os.system("rm %sbinary/AIA171/*" % SAVEPATH)
-	os.system("rm %sraw/AIA193/*" % SAVEPATH); os.system("rm %senhanced/AIA193/*" % SAVEPATH); os.system("rm %sedge/AIA193/*" % SAVEPATH); os.system("rm %sbinary/AIA193/*" % SAVEPATH)
-	os.system("rm %sraw/AIA211/*" % SAVEPATH); os.system("rm %senhanced/AIA211/*" % SAVEPATH); os.system("rm %sedge/AIA211/*" % SAVEPATH); os.system("rm %sbinary/AIA211/*" % SAVEPATH)
-	os.system("rm %sraw/AIA304/*" % SAVEPATH); os.system("rm %senhanced/AIA304/*" % SAVEPATH); os.system("rm %sedge/AIA304/*" % SAVEPATH); os.system("rm %sbinary/AIA304/*" % SAVEPATH)
-	os.system("rm %sraw/AIA335/*" % SAVEPATH); os.system("rm %senhanced/AIA335/*" % SAVEPATH); os.system("rm %sedge/AIA335/*" % SAVEPATH); os.system("rm %sbinary/AIA335/*" % SAVEPATH)
-	os.system("rm %sraw/HMI/*" % SAVEPATH); os.system("rm %senhanced/HMI/*" % SAVEPATH); os.system("rm %sedge/HMI/*" % SAVEPATH); os.system("rm %sbinary/HMI/*" % SAVEPATH)
+	for name in NAMES:
+		for stage in ["raw", "enhanced", "edge", "binary"]:
+			os.system("rm %s%s/%s/*" % (SAVEPATH, stage, name))
 	RECORDER.sys_text("Image directories successfully emptied")
 
+CACHE = ProductCache("%scache/" % SAVEPATH, enabled = not args.nocache)
+if args.clearcache:
+	RECORDER.sys_text("Clearing product cache")
+	CACHE.clear()
+
 def print_raw_info(fits, avg):
 	tqdm.write("\t\t\t%s %s %d" % (fits.observatory, fits.detector, int(fits.measurement.value)))
 	tqdm.write("\t\t\tDatetime:\t%s" % (fits.date))
@@ -107,225 +93,158 @@ def print_bin_info(img):
 	blackpercent = 100. * blackcount / 650.**2
 	tqdm.write("\t\t\t%d (%.2f%%) pixels masked" % (blackcount, blackpercent))
 
-def print_dist(meds, iqrs):
+def print_dist(dist):
 	print "\t\t\t====================="
 	print "\t\t\tID\tMED\tIQR"
-	print "\t\t\t131\t%.3f\t%.3f" % (meds[0], iqrs[0])
-	print "\t\t\t171\t%.3f\t%.3f" % (meds[1], iqrs[1])
-	print "\t\t\t193\t%.3f\t%.3f" % (meds[2], iqrs[2])
-	print "\t\t\t211\t%.3f\t%.3f" % (meds[3], iqrs[3])
-	print "\t\t\t304\t%.3f\t%.3f" % (meds[4], iqrs[4])
-	print "\t\t\t335\t%.3f\t%.3f" % (meds[5], iqrs[5])
+	for name in dist:
+		print "\t\t\t%d\t%.3f\t%.3f" % (CHANNELS[name]["wav"], dist[name][0], dist[name][1])
 	print "\t\t\t====================="
 
 def rgb2gray(rgb):
 	return np.dot(rgb[...,:3], [0.2989, 0.5870, 0.1140])
 
-def make_raw_img(map, data, wav, id, vmax):
-	plt.imsave("%sraw/AIA%d/raw_%04d" % (SAVEPATH, wav, id), tempdata, cmap = "sdoaia%d" % wav, vmin = 2, vmax = vmax, origin = "lower")
-	RECORDER.info_text("%sraw/AIA%d/raw_%04d saved" % (SAVEPATH, wav, id))
-	print_raw_info(map, vmax)
-
-def make_enh_img(sx, sy, wav, id, vmax):
-	e = np.hypot(sx, sy)
-	print_sdata(sx, sy, e)
-	plt.imsave("%senhanced/AIA%d/enhanced_%04d" % (SAVEPATH, wav, id), e, cmap = "sdoaia%d" % wav, vmin = 5, vmax = vmax, origin = "lower")
-	RECORDER.info_text("%senhanced/AIA%d/enhanced_%04d saved" % (SAVEPATH, wav, id))
-
-def make_bin_img(img, wav, id, lowpercentile, highpercentile=100.):
-	inten_ar = rgb2gray(img)
-	low_cut = np.percentile(inten_ar, lowpercentile)
-	high_cut = np.percentile(inten_ar, highpercentile)
-	inten_ar[inten_ar <= low_cut] = 0.
-	inten_ar[inten_ar >= high_cut] = 0.
-	inten_ar[inten_ar != 0] = 1.
-	plt.imsave("%sbinary/AIA%d/binary_%04d" % (SAVEPATH, wav, id), inten_ar, cmap = "gray")
-	RECORDER.info_text("%sbinary/AIA%d/binary_%04d saved" % (SAVEPATH, wav, id))
+def load_raw(map, path, normalize = True):
+	key = CACHE.stage_key(CACHE.source_key(path), "raw", {"norm" : "exposure" if normalize else None})
+	if normalize:
+		return key, CACHE.fetch(key, lambda: map.data / map.exposure_time.value)
+	return key, CACHE.fetch(key, lambda: map.data)
+
+def load_enh(raw_key, data):
+	# data: the frame's unnormalized array, already loaded for the raw image
+	def compute():
+		sx = ndimage.sobel(data, axis = 0, mode = "constant")
+		sy = ndimage.sobel(data, axis = 1, mode = "constant")
+		e = np.hypot(sx, sy)
+		print_sdata(sx, sy, e)
+		return e
+	key = CACHE.stage_key(raw_key, "sobel", {"mode" : "constant"})
+	return key, CACHE.fetch(key, compute)
+
+def make_raw_img(data, key, name, id, vmin, vmax):
+	params = {"cmap" : CHANNELS[name]["cmap"], "vmin" : vmin, "vmax" : vmax}
+	CACHE.render(CACHE.stage_key(key, "png", params),
+				 "%sraw/%s/raw_%04d" % (SAVEPATH, name, id),
+				 lambda f: plt.imsave(f, data, origin = "lower", **params))
+	RECORDER.info_text("%sraw/%s/raw_%04d saved" % (SAVEPATH, name, id))
+
+def make_enh_img(raw_key, data, name, id, vmax):
+	# returns the enhanced image's cache key, which make_bin_img derives the binary image from
+	key, e = load_enh(raw_key, data)
+	params = {"cmap" : CHANNELS[name]["cmap"], "vmin" : 5, "vmax" : vmax}
+	enh_key = CACHE.stage_key(key, "png", params)
+	CACHE.render(enh_key,
+				 "%senhanced/%s/enhanced_%04d" % (SAVEPATH, name, id),
+				 lambda f: plt.imsave(f, e, origin = "lower", **params))
+	RECORDER.info_text("%senhanced/%s/enhanced_%04d saved" % (SAVEPATH, name, id))
+	return enh_key
+
+def make_hmi_enh_img(raw_key, data, id):
+	key = CACHE.stage_key(raw_key, "threshold", {"abs" : 600})
+	hmi_thresh_data = CACHE.fetch(key, lambda: np.logical_or(data > 600, data < -600) * data)
+	params = {"cmap" : "gray", "vmin" : CHANNELS["HMI"]["raw_vmin"], "vmax" : CHANNELS["HMI"]["enh_vmax"]}
+	CACHE.render(CACHE.stage_key(key, "png", params),
+				 "%senhanced/HMI/enhanced_%04d" % (SAVEPATH, id),
+				 lambda f: plt.imsave(f, hmi_thresh_data, origin = "lower", **params))
+	RECORDER.info_text("%senhanced/HMI/enhanced_%04d saved" % (SAVEPATH, id))
+
+def make_bin_img(enh_key, name, id, lowpercentile, highpercentile=100.):
+	def compute():
+		inten_ar = rgb2gray(imageio.imread("%senhanced/%s/enhanced_%04d.png" % (SAVEPATH, name, id)))
+		low_cut = np.percentile(inten_ar, lowpercentile)
+		high_cut = np.percentile(inten_ar, highpercentile)
+		inten_ar[inten_ar <= low_cut] = 0.
+		inten_ar[inten_ar >= high_cut] = 0.
+		inten_ar[inten_ar != 0] = 1.
+		return inten_ar
+	key = CACHE.stage_key(enh_key, "binary", {"low" : lowpercentile, "high" : highpercentile})
+	inten_ar = CACHE.fetch(key, compute, np.uint8)
+	CACHE.render(CACHE.stage_key(key, "png", {"cmap" : "gray"}),
+				 "%sbinary/%s/binary_%04d" % (SAVEPATH, name, id),
+				 lambda f: plt.imsave(f, inten_ar, cmap = "gray"))
+	RECORDER.info_text("%sbinary/%s/binary_%04d saved" % (SAVEPATH, name, id))
 	print_bin_info(inten_ar)
 
 ##### ----- #####
 ##### ----- #####
-N = 1 # len(DIR131)
+N = 1 # len(ALIGNMENT)
 ##### ----- #####
 ##### ----- #####
 
 C = 0.6
-med_131 = []; med_171 = []; med_193 = []; med_211 = []; med_304 = []; med_335 = []
-
-for K in tqdm(range(N), desc = "Generating raw images"):
-	temp = Map(PATH131 + DIR131[K])
-	RECORDER.sys_text("|===================== Processing datetime %s =====================|" % temp.date)
-	K131.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K131[-1][0] / K131[-1][1]
-	med_131.append(tempdata.max())
-	if len(med_131) == 16:
-		med_131.pop(0)
-	make_raw_img(temp, tempdata, 131, K, C * np.median(med_131))
-
-	temp = Map(PATH171 + DIR171[K])
-	K171.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K171[-1][0] / K171[-1][1]
-	med_171.append(tempdata.max())
-	if len(med_171) == 16:
-		med_171.pop(0)
-	make_raw_img(temp, tempdata, 171, K, C * np.median(med_171))
-
-	temp = Map(PATH193 + DIR193[K])
-	K193.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K193[-1][0] / K193[-1][1]
-	med_193.append(tempdata.max())
-	if len(med_193) == 16:
-		med_193.pop(0)
-	make_raw_img(temp, tempdata, 193, K, C * np.median(med_193))
-
-	temp = Map(PATH211 + DIR211[K])
-	K211.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K211[-1][0] / K211[-1][1]
-	med_211.append(tempdata.max())
-	if len(med_211) == 16:
-		med_211.pop(0)
-	make_raw_img(temp, tempdata, 211, K, C * np.median(med_211))
-
-	temp = Map(PATH304 + DIR304[K])
-	K304.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K304[-1][0] / K304[-1][1]
-	med_304.append(tempdata.max())
-	if len(med_304) == 16:
-		med_304.pop(0)
-	make_raw_img(temp, tempdata, 304, K, C * np.median(med_304))
-
-	temp = Map(PATH335 + DIR335[K])
-	K335.append([temp.data, temp.exposure_time.value, temp.date, temp.meta])
-	tempdata = K335[-1][0] / K335[-1][1]
-	med_335.append(tempdata.max())
-	if len(med_335) == 16:
-		med_335.pop(0)
-	make_raw_img(temp, tempdata, 335, K, C * np.median(med_335))
-
-	tempdata = Map(PATHHMI + DIRHMI[K]).data
-	KHMI.append(tempdata)
-	plt.imsave("%sraw/HMI/raw_%04d" % (SAVEPATH, K), tempdata, cmap = "gray", vmin = -125, vmax = 125, origin = "lower")
-	RECORDER.info_text("%sraw/HMI/raw_%04d saved" % (SAVEPATH, K))
-
-for K in tqdm(range(N), desc = "Generating intensity distribution"):
-	if K131[K][1] > 0:
-		t131 = np.append(t131, np.median(K131[K][0] / K131[K][1]))
-	if K171[K][1] > 0:
-		t171 = np.append(t171, np.median(K171[K][0] / K171[K][1]))
-	if K193[K][1] > 0:
-		t193 = np.append(t193, np.median(K193[K][0] / K193[K][1]))
-	if K211[K][1] > 0:
-		t211 = np.append(t211, np.median(K211[K][0] / K211[K][1]))
-	if K304[K][1] > 0:
-		t304 = np.append(t304, np.median(K304[K][0] / K304[K][1]))
-	if K335[K][1] > 0:
-		t335 = np.append(t335, np.median(K335[K][0] / K335[K][1]))
-
-meds = [np.median(t131), np.median(t171), np.median(t193), np.median(t211), np.median(t304), np.median(t335)]
-iqrs = [iqr(t131), iqr(t171), iqr(t193), iqr(t211), iqr(t304), iqr(t335)]
-print_dist(meds, iqrs)
-
-for K in tqdm(range(N), desc = "Generating enhanced images"):
-	RECORDER.sys_text("|===================== Processing datetime %s (#%d) =====================|" % (K131[K][2], K))
-
-	sx = ndimage.sobel(K131[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K131[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 131, K, 130)
-
-	sx = ndimage.sobel(K171[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K171[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 171, K, 1115)
-
-	sx = ndimage.sobel(K193[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K193[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 193, K, 1260)
-
-	sx = ndimage.sobel(K211[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K211[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 211, K, 830)
-
-	sx = ndimage.sobel(K304[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K304[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 304, K, 625)
-
-	sx = ndimage.sobel(K335[K][0], axis = 0, mode = "constant")
-	sy = ndimage.sobel(K335[K][0], axis = 1, mode = "constant")
-	make_enh_img(sx, sy, 335, K, 220)
-
-	hmi_absthresh_mask = np.logical_or(KHMI[K] > 600, KHMI[K] < -600)
-	KHMI.append(hmi_absthresh_mask)
-	hmi_thresh_data = hmi_absthresh_mask * KHMI[K]
-	plt.imsave("%senhanced/HMI/enhanced_%04d" % (SAVEPATH, K), hmi_thresh_data, cmap = "gray", vmin = -125, vmax = 125, origin = "lower")
-	RECORDER.info_text("%senhanced/HMI/enhanced_%04d saved" % (SAVEPATH, K))
 
 # percentile corresponding to 50:
 # 85.4, 85.9, 89.65, 91.55, 96.18, 99.65
 
-C = 0.015
-D = 0.025
+def process_channel(name):
+	channel = CHANNELS[name]
+	enh_keys = []
+	maxima = []
+	medians = []
 
-for K in tqdm(range(N), desc = "Generating binary images"):
-	img = imageio.imread("%senhanced/AIA131/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 131, K, 94.41 - C*K)
+	# the enhanced image is made while the frame is loaded, so each FITS file is read once
+	for K in tqdm(range(N), desc = "Generating %s raw and enhanced images" % name):
+		path = DIRS[name][K]
+		temp = Map(path)
+		RECORDER.sys_text("|===================== Processing %s datetime %s =====================|" % (name, temp.date))
 
-	img = imageio.imread("%senhanced/AIA171/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 171, K, 94.9 - C*K)
+		if channel["instr"] == "HMI":
+			key, tempdata = load_raw(temp, path, normalize = False)
+			make_raw_img(tempdata, key, name, K, channel["raw_vmin"], channel["raw_vmax"])
+			make_hmi_enh_img(key, tempdata, K)
+			continue
 
-	img = imageio.imread("%senhanced/AIA193/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 193, K, 95.4 - C*K)
+		key, tempdata = load_raw(temp, path)
+		maxima.append(tempdata.max())
+		if len(maxima) == 16:
+			maxima.pop(0)
+		make_raw_img(tempdata, key, name, K, channel["raw_vmin"], C * np.median(maxima))
+		print_raw_info(temp, C * np.median(maxima))
+		enh_keys.append(make_enh_img(key, temp.data, name, K, channel["enh_vmax"]))
 
-	img = imageio.imread("%senhanced/AIA211/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 211, K, 96.1 - C*K)
+		if temp.exposure_time.value > 0:
+			medians.append(np.median(tempdata))
 
-	img = imageio.imread("%senhanced/AIA304/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 304, K, 97.2 - D*K)
+	if channel["instr"] == "HMI":
+		return None
 
-	img = imageio.imread("%senhanced/AIA335/enhanced_%04d.png" % (SAVEPATH, K))
-	make_bin_img(img, 335, K, 99.6 - C*K)
+	for K in tqdm(range(N), desc = "Generating %s binary images" % name):
+		make_bin_img(enh_keys[K], name, K, channel["bin_percentile"] - channel["bin_drift"] * K)
 
-	# plt.imsave("%sbinary/HMI/binary_%04d" % (SAVEPATH, K), KHMI[K], cmap = "gray", origin = "lower")
-	# RECORDER.info_text("%sbinary/HMI/binary_%04d saved" % (SAVEPATH, K))
+	return (np.median(medians), iqr(medians))
+
+DIST = run_channels(process_channel, NAMES, args.processes)
+print_dist(dict((name, DIST[name]) for name in AIA_NAMES))
 
 for K in tqdm(range(N), desc = "Generating traced images"):
 	pass
 
 FPS = 30
-
-RECORDER.sys_text("|================ Generating raw videos =====================|")
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA131/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA131_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA171/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA171_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA193/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA193_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA211/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA211_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA304/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA304_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/AIA335/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/AIA335_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sraw/HMI/raw_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sraw/HMI_raw.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -i %sraw/AIA131_raw.mp4 -i %sraw/AIA171_raw.mp4 -i %sraw/AIA193_raw.mp4 -i %sraw/AIA211_raw.mp4 -i %sraw/AIA304_raw.mp4 -i %sraw/AIA335_raw.mp4 -filter_complex hstack=inputs=6 %sraw/COMBINED_raw.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-# os.system("ffmpeg -loglevel panic -y -i %sraw/AIA131_raw.mp4 -i %sraw/AIA171_raw.mp4 -i %sraw/AIA193_raw.mp4 -i %sraw/AIA211_raw.mp4 -i %sraw/AIA304_raw.mp4 -i %sraw/AIA335_raw.mp4 -i %sraw/HMI_raw.mp4 -filter_complex hstack=inputs=7 %sraw/COMBINED_raw.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-
-RECORDER.sys_text("|================ Generating enhanced videos ================|")
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA131/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA131_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA171/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA171_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA193/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA193_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA211/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA211_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA304/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA304_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/AIA335/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/AIA335_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %senhanced/HMI/enhanced_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %senhanced/HMI_enhanced.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -i %senhanced/AIA131_enhanced.mp4 -i %senhanced/AIA171_enhanced.mp4 -i %senhanced/AIA193_enhanced.mp4 -i %senhanced/AIA211_enhanced.mp4 -i %senhanced/AIA304_enhanced.mp4 -i %senhanced/AIA335_enhanced.mp4 -filter_complex hstack=inputs=6 %senhanced/COMBINED_enhanced.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-# os.system("ffmpeg -loglevel panic -y -i %senhanced/AIA131_enhanced.mp4 -i %senhanced/AIA171_enhanced.mp4 -i %senhanced/AIA193_enhanced.mp4 -i %senhanced/AIA211_enhanced.mp4 -i %senhanced/AIA304_enhanced.mp4 -i %senhanced/AIA335_enhanced.mp4 -i %senhanced/HMI_enhanced.mp4 -filter_complex hstack=inputs=7 %senhanced/COMBINED_enhanced.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-
-RECORDER.sys_text("|================ Generating binary videos ==================|")
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA131/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA131_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA171/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA171_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA193/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA193_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA211/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA211_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA304/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA304_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/AIA335/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/AIA335_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sbinary/HMI/binary_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sbinary/HMI_binary.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
-os.system("ffmpeg -loglevel panic -y -i %sbinary/AIA131_binary.mp4 -i %sbinary/AIA171_binary.mp4 -i %sbinary/AIA193_binary.mp4 -i %sbinary/AIA211_binary.mp4 -i %sbinary/AIA304_binary.mp4 -i %sbinary/AIA335_binary.mp4 -filter_complex hstack=inputs=6 %sbinary/COMBINED_binary.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-# os.system("ffmpeg -loglevel panic -y -i %sbinary/AIA131_binary.mp4 -i %sbinary/AIA171_binary.mp4 -i %sbinary/AIA193_binary.mp4 -i %sbinary/AIA211_binary.mp4 -i %sbinary/AIA304_binary.mp4 -i %sbinary/AIA335_binary.mp4 -i %sbinary/HMI_binary.mp4 -filter_complex hstack=inputs=7 %sbinary/COMBINED_binary.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
-
-RECORDER.sys_text("|================ Generating stacked video ================|")
-os.system("ffmpeg -loglevel panic -y -i %sraw/COMBINED_raw.mp4 -i %senhanced/COMBINED_enhanced.mp4 -i %sbinary/COMBINED_binary.mp4 -filter_complex vstack=inputs=3 %s/STACKED.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
+STAGES = ["raw", "enhanced", "binary"]
+
+def make_videos(name):
+	for stage in STAGES:
+		if not os.path.isfile("%s%s/%s/%s_0000.png" % (SAVEPATH, stage, name, stage)):
+			continue
+		os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %s%s/%s/%s_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %s%s/%s_%s.mp4" % (FPS, SAVEPATH, stage, name, stage, N, SAVEPATH, stage, name, stage))
+
+RECORDER.sys_text("|================ Generating channel videos =================|")
+run_channels(make_videos, NAMES, args.processes)
+
+# hstack needs at least two inputs: a single AIA channel's video is copied as the combined video
+if len(AIA_NAMES) == 0:
+	RECORDER.warn_text("No AIA channels selected; skipping combined and stacked videos")
+else:
+	for stage in STAGES:
+		RECORDER.sys_text("|================ Generating combined %s video ================|" % stage)
+		if len(AIA_NAMES) == 1:
+			RECORDER.info_text("Only %s selected; copying its %s video" % (AIA_NAMES[0], stage))
+			shutil.copyfile("%s%s/%s_%s.mp4" % (SAVEPATH, stage, AIA_NAMES[0], stage), "%s%s/COMBINED_%s.mp4" % (SAVEPATH, stage, stage))
+			continue
+		inputs = " ".join(["-i %s%s/%s_%s.mp4" % (SAVEPATH, stage, name, stage) for name in AIA_NAMES])
+		os.system("ffmpeg -loglevel panic -y %s -filter_complex hstack=inputs=%d %s%s/COMBINED_%s.mp4" % (inputs, len(AIA_NAMES), SAVEPATH, stage, stage))
+
+	RECORDER.sys_text("|================ Generating stacked video ================|")
+	os.system("ffmpeg -loglevel panic -y -i %sraw/COMBINED_raw.mp4 -i %senhanced/COMBINED_enhanced.mp4 -i %sbinary/COMBINED_binary.mp4 -filter_complex vstack=inputs=3 %s/STACKED.mp4" % (SAVEPATH, SAVEPATH, SAVEPATH, SAVEPATH))
 
 # RECORDER.sys_text("|================ Generating edge videos ====================|")
 # os.system("ffmpeg -loglevel panic -y -f image2 -start_number 0 -framerate %d -i %sedge/AIA94/edge_%%04d.png -vframes %d -q:v 2 -vcodec mpeg4 -b:v 800k %sedge/AIA94_edge.mp4" % (FPS, SAVEPATH, N, SAVEPATH))
@@ -1,23 +1,17 @@
 import numpy as np
 import scipy
 import scipy.ndimage as ndimage
-import scipy.ndimage.filters as filters
 import matplotlib.pyplot as plt
 import sunpy.cm as cm
 from IPython.core import debugger; debug = debugger.Pdb().set_trace
+from peaks import peak_labels
 
 neighborhood_size = 45
 threshold = 4.5
 
 data = np.load("t.npy")
 
-data_max = filters.maximum_filter(data, neighborhood_size)
-maxima = (data == data_max)
-data_min = filters.minimum_filter(data, neighborhood_size)
-diff = ((data_max - data_min) > threshold)
-maxima[diff == 0] = 0
-
-labeled, num_objects = ndimage.label(maxima)
+labeled, num_objects = peak_labels(data, neighborhood_size, threshold)
 slices = ndimage.find_objects(labeled)
 x, y = [], []
 for dy,dx in slices:
@@ -0,0 +1,112 @@
+# Multi-channel timestamp alignment by vectorized nearest-neighbour matching
+
+from channels import CHANNELS
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_TOLERANCE = 6.0 # seconds, half the AIA EUV cadence
+GAP_FACTOR = 1.5 # cadence multiple beyond which consecutive frames count as a gap
+DUPLICATE_SPACING = 0.5 # seconds
+
+def tolerance(name):
+	return float(CHANNELS[name]["tolerance"]) if name in CHANNELS else DEFAULT_TOLERANCE
+
+def nearest_indices(times, targets, tol):
+	# index into sorted `times` of the closest sample to each target, -1 if farther than tol
+	times = np.asarray(times, dtype = np.float64)
+	targets = np.asarray(targets, dtype = np.float64)
+	if len(times) == 0:
+		return np.full(len(targets), -1, dtype = int)
+
+	right = np.clip(np.searchsorted(times, targets), 0, len(times) - 1)
+	left = np.clip(right - 1, 0, len(times) - 1)
+	closer = np.abs(times[left] - targets) <= np.abs(times[right] - targets)
+	index = np.where(closer, left, right)
+	index[np.abs(times[index] - targets) > tol] = -1
+	return index
+
+class Alignment(object):
+
+	def __init__(self, times, reference, tolerances = None, items = None):
+		self.REFERENCE = reference
+		self.NAMES = list(times)
+		self.TOLERANCES = dict((name, tolerance(name)) for name in self.NAMES)
+		self.TOLERANCES.update(tolerances or {})
+		self.TIMES = OrderedDict()
+		self.ITEMS = OrderedDict()
+		self.INDEX = OrderedDict()
+
+		for name in self.NAMES:
+			t = np.asarray(times[name], dtype = np.float64)
+			order = np.argsort(t, kind = "mergesort")
+			self.TIMES[name] = t[order]
+			self.ITEMS[name] = [items[name][k] for k in order] if items is not None else list(order)
+
+		ref = self.TIMES[reference]
+		for name in self.NAMES:
+			if name == reference:
+				self.INDEX[name] = np.arange(len(ref))
+			else:
+				self.INDEX[name] = nearest_indices(self.TIMES[name], ref, self.TOLERANCES[name])
+
+		self.MATCHED = np.all(np.array([self.INDEX[name] >= 0 for name in self.NAMES]), axis = 0) if len(ref) > 0 else np.zeros(0, dtype = bool)
+
+	def __len__(self):
+		return int(self.MATCHED.sum())
+
+	##### matched output
+
+	def times(self):
+		return self.TIMES[self.REFERENCE][self.MATCHED]
+
+	def tuples(self):
+		rows = np.flatnonzero(self.MATCHED)
+		return [tuple(self.ITEMS[name][self.INDEX[name][k]] for name in self.NAMES) for k in rows]
+
+	def columns(self):
+		rows = np.flatnonzero(self.MATCHED)
+		return OrderedDict((name, [self.ITEMS[name][k] for k in self.INDEX[name][rows]]) for name in self.NAMES)
+
+	def offsets(self, name):
+		return self.TIMES[name][self.INDEX[name][self.MATCHED]] - self.times()
+
+	##### diagnostics
+
+	def dropped(self, name):
+		# reference frames with no counterpart in this channel
+		return self.TIMES[self.REFERENCE][self.INDEX[name] < 0]
+
+	def unused(self, name):
+		# channel frames that no matched tuple uses
+		used = np.zeros(len(self.TIMES[name]), dtype = bool)
+		used[self.INDEX[name][self.MATCHED]] = True
+		return self.TIMES[name][~used]
+
+	def duplicates(self, name):
+		# frames sharing a timestamp with their predecessor
+		t = self.TIMES[name]
+		return t[1:][np.diff(t) < DUPLICATE_SPACING]
+
+	def gaps(self, name):
+		t = self.TIMES[name]
+		if len(t) < 3:
+			return []
+		step = np.diff(t)
+		cadence = np.median(step)
+		where = np.flatnonzero(step > GAP_FACTOR * cadence)
+		return [(t[k], t[k + 1]) for k in where]
+
+	def report(self):
+		lines = ["%d of %d %s frames matched across %s" % (len(self), len(self.TIMES[self.REFERENCE]), self.REFERENCE, ", ".join(self.NAMES))]
+		for name in self.NAMES:
+			lines.append("%s:\t%d frames, %d gaps, %d duplicates, %d dropped, %d unused, tolerance %.1f s" %
+						 (name, len(self.TIMES[name]), len(self.gaps(name)), len(self.duplicates(name)),
+						  len(self.dropped(name)), len(self.unused(name)), self.TOLERANCES[name]))
+		return lines
+
+def align_catalog(catalog, names, reference = None, tolerances = None):
+	reference = reference or names[0]
+	frames = dict((name, catalog.frames(name)) for name in names)
+	times = OrderedDict((name, [row["t"] for row in frames[name]]) for name in names)
+	items = dict((name, [row["path"] for row in frames[name]]) for name in names)
+	return Alignment(times, reference, tolerances, items)
@@ -0,0 +1,46 @@
+# Streaming region archive: a tar written member by member as regions are committed, the database last
+
+from io import BytesIO
+import numpy as np
+import os
+import tarfile
+import time
+
+ROOT = "region-data" # top directory inside the archive, as in the old end-of-run zip
+
+class RegionArchive(object):
+
+	def __init__(self, path):
+		# plain (uncompressed) tar: members are self-delimiting, so everything written before a
+		# crash can still be listed and extracted
+		directory = os.path.dirname(path)
+		if directory != "" and not os.path.isdir(directory):
+			os.makedirs(directory)
+		self.PATH = path
+		self.TAR = tarfile.open(path, "w")
+
+	def add(self, name, blob):
+		info = tarfile.TarInfo("%s/%s" % (ROOT, name))
+		info.size = len(blob)
+		info.mtime = time.time()
+		self.TAR.addfile(info, BytesIO(blob))
+
+	def add_array(self, id, product, channel, data):
+		# the same name and .npy format the per-file region-data layout used
+		buffer = BytesIO()
+		np.save(buffer, np.asarray(data))
+		self.add("%s/%05d%s.npy" % (product, int(id), channel), buffer.getvalue())
+
+	def add_file(self, path, name = None):
+		with open(path, "rb") as f:
+			self.add(name or os.path.basename(path), f.read())
+
+	def flush(self):
+		self.TAR.fileobj.flush()
+		os.fsync(self.TAR.fileobj.fileno())
+
+	def close(self, index = ()):
+		# index files (e.g. the final database) go in last, then the end-of-archive blocks
+		for path in index:
+			self.add_file(path)
+		self.TAR.close()
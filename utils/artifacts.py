@@ -0,0 +1,118 @@
+# Append-only artifact store: per-region arrays packed into a few chunk files, indexed by (region ID, product, channel)
+
+import numpy as np
+import os
+import shutil
+import sqlite3
+import zlib
+
+STORE_PATH = "resources/region-data/artifacts"
+CHUNK_SIZE = 256 << 20 # bytes per chunk file before a new one is started
+ALIGN = 64 # blob offsets are aligned so uncompressed arrays memory-map cleanly
+LEVEL = 1 # zlib level when compression is on
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+	id INTEGER,
+	product TEXT,
+	channel TEXT,
+	chunk INTEGER,
+	offset INTEGER,
+	nbytes INTEGER,
+	shape TEXT,
+	dtype TEXT,
+	compressed INTEGER,
+	PRIMARY KEY (id, product, channel)
+);
+"""
+
+class ArtifactStore(object):
+
+	def __init__(self, path = STORE_PATH, compress = False, chunk_size = CHUNK_SIZE, clear = False):
+		# compression is applied blob by blob, so appends and single reads never touch the rest of a chunk
+		if clear and os.path.isdir(path):
+			shutil.rmtree(path)
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		self.PATH = path
+		self.COMPRESS = compress
+		self.CHUNK_SIZE = chunk_size
+
+		self.db = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread = False)
+		self.db.executescript(SCHEMA)
+		last = self.db.execute("SELECT MAX(chunk) FROM artifacts").fetchone()[0]
+		self.chunk = 0 if last is None else last
+		self.handle = None
+
+	def chunk_path(self, chunk):
+		return os.path.join(self.PATH, "chunk-%05d.bin" % chunk)
+
+	def open_chunk(self, size):
+		if self.handle is None:
+			self.handle = open(self.chunk_path(self.chunk), "ab")
+		position = self.handle.tell()
+		if position > 0 and position + size > self.CHUNK_SIZE:
+			self.handle.close()
+			self.chunk += 1
+			self.handle = open(self.chunk_path(self.chunk), "ab")
+			position = 0
+		if position % ALIGN:
+			self.handle.write(b"\0" * (ALIGN - position % ALIGN))
+		return self.handle.tell()
+
+	def put(self, id, product, channel, data):
+		data = np.ascontiguousarray(data)
+		blob = data.tobytes()
+		if self.COMPRESS:
+			blob = zlib.compress(blob, LEVEL)
+
+		offset = self.open_chunk(len(blob))
+		self.handle.write(blob)
+		self.db.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+						(int(id), product, channel, self.chunk, offset, len(blob),
+						 ",".join(str(n) for n in data.shape), data.dtype.str, int(self.COMPRESS)))
+
+	def drop(self, ids):
+		# removes regions from the index; their bytes stay in the chunk files, unreachable
+		self.db.executemany("DELETE FROM artifacts WHERE id = ?", [(int(id),) for id in ids])
+
+	def flush(self):
+		if self.handle is not None:
+			self.handle.flush()
+		self.db.commit()
+
+	def get(self, id, product, channel):
+		# uncompressed arrays come back memory-mapped (read-only); raises KeyError when absent
+		row = self.db.execute("SELECT chunk, offset, nbytes, shape, dtype, compressed FROM artifacts "
+							  "WHERE id = ? AND product = ? AND channel = ?", (int(id), product, channel)).fetchone()
+		if row is None:
+			raise KeyError((id, product, channel))
+		chunk, offset, nbytes, shape, dtype, compressed = row
+		shape = tuple(int(n) for n in shape.split(",") if n != "")
+		if self.handle is not None and chunk == self.chunk:
+			self.handle.flush()
+
+		if nbytes == 0:
+			return np.zeros(shape, dtype = dtype)
+		if compressed:
+			with open(self.chunk_path(chunk), "rb") as f:
+				f.seek(offset)
+				return np.frombuffer(zlib.decompress(f.read(nbytes)), dtype = dtype).reshape(shape)
+		return np.memmap(self.chunk_path(chunk), dtype = dtype, mode = "r", offset = offset, shape = shape)
+
+	def keys(self, id = None):
+		query = "SELECT id, product, channel FROM artifacts"
+		if id is not None:
+			return self.db.execute(query + " WHERE id = ? ORDER BY product, channel", (int(id),)).fetchall()
+		return self.db.execute(query + " ORDER BY id, product, channel").fetchall()
+
+	def __contains__(self, key):
+		return self.db.execute("SELECT 1 FROM artifacts WHERE id = ? AND product = ? AND channel = ?",
+							   (int(key[0]), key[1], key[2])).fetchone() is not None
+
+	def close(self):
+		self.flush()
+		if self.handle is not None:
+			self.handle.close()
+			self.handle = None
+		self.db.close()
@@ -0,0 +1,69 @@
+# Summed-area tables: O(1) box sums and means over a frame, and region bound growth for all regions at once
+
+import numpy as np
+
+CHUNK = 256 # half-widths tested per pass of grow()
+
+def summed_area(data):
+	# one leading row and column of zeros, so any box is four lookups; integer data stays exact in int64
+	dtype = np.int64 if np.issubdtype(data.dtype, np.integer) else np.float64
+	table = np.zeros((data.shape[0] + 1, data.shape[1] + 1), dtype = dtype)
+	np.cumsum(data, axis = 0, dtype = dtype, out = table[1:, 1:])
+	np.cumsum(table[1:, 1:], axis = 1, out = table[1:, 1:])
+	return table
+
+class BoxStats(object):
+
+	def __init__(self, data):
+		self.SHAPE = data.shape
+		invalid = np.isnan(data) if np.issubdtype(data.dtype, np.floating) else None
+		if invalid is not None and invalid.any():
+			self.TABLE = summed_area(np.where(invalid, 0, data))
+			self.INVALID = summed_area(invalid.astype(np.int32))
+		else:
+			self.TABLE = summed_area(data)
+			self.INVALID = None
+
+	def box(self, table, r0, r1, c0, c1):
+		return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+
+	def clip(self, r0, r1, c0, c1):
+		# numpy slicing semantics for non-negative starts: stops past the edge are cut off
+		r0, c0 = np.maximum(r0, 0), np.maximum(c0, 0)
+		r1 = np.maximum(np.minimum(r1, self.SHAPE[0]), r0)
+		c1 = np.maximum(np.minimum(c1, self.SHAPE[1]), c0)
+		return r0, r1, c0, c1
+
+	def sum(self, r0, r1, c0, c1):
+		# sum of data[r0:r1, c0:c1]; arguments may be arrays of boxes
+		return self.box(self.TABLE, *self.clip(r0, r1, c0, c1))
+
+	def mean(self, r0, r1, c0, c1):
+		# NaN for empty boxes and for boxes holding a NaN, as np.average would give
+		r0, r1, c0, c1 = self.clip(r0, r1, c0, c1)
+		count = (r1 - r0) * (c1 - c0)
+		with np.errstate(divide = "ignore", invalid = "ignore"):
+			mean = self.box(self.TABLE, r0, r1, c0, c1) / np.asarray(count, dtype = float)
+		if self.INVALID is not None:
+			mean = np.where(self.box(self.INVALID, r0, r1, c0, c1) > 0, np.nan, mean)
+		return mean
+
+	def grow(self, centers, threshold, start = 1):
+		# for each (row, col) center, the first half-width H >= start at which the mean of
+		# data[row - H : row + H, col - H : col + H] is no longer above threshold, i.e. the
+		# result of "while mean > threshold: H += 1"; a box reaching past the top or left edge
+		# is empty under slicing, so growth stops there as well
+		centers = np.asarray(centers, dtype = int).reshape(-1, 2)
+		sizes = np.zeros(len(centers), dtype = int)
+		for n, (row, col) in enumerate(centers):
+			edge = min(row, col) + 1
+			H = start
+			while H < edge:
+				h = np.arange(H, min(H + CHUNK, edge))
+				below = ~(self.mean(row - h, row + h, col - h, col + h) > threshold)
+				if below.any():
+					H = h[np.argmax(below)]
+					break
+				H = h[-1] + 1
+			sizes[n] = H
+		return sizes
@@ -0,0 +1,82 @@
+# Content-addressed cache for derived image products (raw, enhanced, binary, rendered)
+
+import hashlib
+import json
+import numpy as np
+import os
+import shutil
+
+class ProductCache(object):
+
+	def __init__(self, cache_dir = "data/cache/", enabled = True):
+		self.CACHE_DIR = cache_dir
+		self.ENABLED = enabled
+		self.hits = 0
+		self.misses = 0
+
+		if not os.path.isdir(self.CACHE_DIR):
+			os.makedirs(self.CACHE_DIR)
+
+	##### keys
+
+	def source_key(self, path):
+		stat = os.stat(path)
+		identity = "%s|%d|%d" % (os.path.abspath(path), stat.st_size, int(stat.st_mtime))
+		return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+	def stage_key(self, parent, stage, params = None):
+		identity = "%s|%s|%s" % (parent, stage, json.dumps(params, sort_keys = True))
+		return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+	##### arrays
+
+	def _array_path(self, key):
+		return os.path.join(self.CACHE_DIR, key[:2], key + ".npy")
+
+	def has(self, key):
+		return self.ENABLED and os.path.isfile(self._array_path(key))
+
+	def load(self, key):
+		return np.load(self._array_path(key))
+
+	def save(self, key, data, dtype = np.float32):
+		path = self._array_path(key)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path + ".tmp", "wb") as f:
+			np.save(f, np.asarray(data, dtype = dtype))
+		os.rename(path + ".tmp", path)
+
+	def fetch(self, key, compute, dtype = np.float32):
+		if self.has(key):
+			self.hits += 1
+			return self.load(key)
+		self.misses += 1
+		data = np.asarray(compute(), dtype = dtype)
+		if self.ENABLED:
+			self.save(key, data, dtype)
+		return data
+
+	##### rendered images
+
+	def _render_path(self, key):
+		return os.path.join(self.CACHE_DIR, key[:2], key + ".png")
+
+	def render(self, key, path, draw):
+		cached = self._render_path(key)
+		if self.ENABLED and os.path.isfile(cached):
+			self.hits += 1
+		else:
+			self.misses += 1
+			if not os.path.isdir(os.path.dirname(cached)):
+				os.makedirs(os.path.dirname(cached))
+			draw(cached + ".tmp.png")
+			os.rename(cached + ".tmp.png", cached)
+		if not path.endswith(".png"):
+			path += ".png"
+		shutil.copyfile(cached, path)
+		return path
+
+	def clear(self):
+		shutil.rmtree(self.CACHE_DIR, ignore_errors = True)
+		os.makedirs(self.CACHE_DIR)
@@ -0,0 +1,199 @@
+# SQLite index of FITS files by channel and observation time
+
+from datetime import datetime
+from fitsscan import read_header, scan_files
+import calendar
+import os
+import sqlite3
+import warnings
+
+CATALOG_PATH = "resources/catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+	path TEXT PRIMARY KEY,
+	channel TEXT,
+	instrument TEXT,
+	wavelength INTEGER,
+	date_obs TEXT,
+	t REAL,
+	exptime REAL,
+	naxis1 INTEGER,
+	naxis2 INTEGER,
+	crpix1 REAL,
+	crpix2 REAL,
+	cdelt1 REAL,
+	cdelt2 REAL,
+	rsun_obs REAL,
+	size INTEGER,
+	mtime INTEGER
+);
+CREATE INDEX IF NOT EXISTS frames_channel_t ON frames (channel, t);
+CREATE TABLE IF NOT EXISTS quarantine (
+	path TEXT PRIMARY KEY,
+	reason TEXT
+);
+"""
+
+# quarantined frames stay on disk and in the index, but queries skip them
+VISIBLE = "path NOT IN (SELECT path FROM quarantine)"
+
+COLUMNS = ["path", "channel", "instrument", "wavelength", "date_obs", "t", "exptime",
+		   "naxis1", "naxis2", "crpix1", "crpix2", "cdelt1", "cdelt2", "rsun_obs", "size", "mtime"]
+
+def to_seconds(when):
+	if isinstance(when, (int, float)):
+		return float(when)
+	if hasattr(when, "datetime"):
+		when = when.datetime
+	if not isinstance(when, datetime):
+		when = str(when).strip().rstrip("Z").replace(" ", "T")
+		if "." in when:
+			when, frac = when.split(".")
+			when = datetime.strptime(when, "%Y-%m-%dT%H:%M:%S").replace(microsecond = int(float("0." + frac) * 1e6))
+		else:
+			when = datetime.strptime(when, "%Y-%m-%dT%H:%M:%S")
+	return calendar.timegm(when.timetuple()) + when.microsecond / 1e6
+
+def channel_name(instrument, wavelength):
+	if instrument.upper().startswith("HMI"):
+		return "HMI"
+	return "AIA%d" % wavelength
+
+def header_record(path, header):
+	stat = os.stat(path)
+	instrument = str(header.get("INSTRUME", header.get("TELESCOP", "")))
+	wavelength = int(header.get("WAVELNTH", 0))
+	date_obs = str(header.get("DATE-OBS", header.get("T_OBS", "")))
+	return {
+		"path" : os.path.abspath(path),
+		"channel" : channel_name(instrument, wavelength),
+		"instrument" : instrument,
+		"wavelength" : wavelength,
+		"date_obs" : date_obs,
+		"t" : to_seconds(date_obs),
+		"exptime" : float(header.get("EXPTIME", 0.0)),
+		"naxis1" : int(header.get("ZNAXIS1", header.get("NAXIS1", 0))),
+		"naxis2" : int(header.get("ZNAXIS2", header.get("NAXIS2", 0))),
+		"crpix1" : float(header.get("CRPIX1", 0.0)),
+		"crpix2" : float(header.get("CRPIX2", 0.0)),
+		"cdelt1" : float(header.get("CDELT1", 0.0)),
+		"cdelt2" : float(header.get("CDELT2", 0.0)),
+		"rsun_obs" : float(header.get("RSUN_OBS", 0.0)),
+		"size" : stat.st_size,
+		"mtime" : int(stat.st_mtime)
+	}
+
+class Catalog(object):
+
+	def __init__(self, db_path = CATALOG_PATH):
+		self.DB_PATH = db_path
+		self.db = sqlite3.connect(db_path)
+		self.db.row_factory = sqlite3.Row
+		self.db.executescript(SCHEMA)
+
+	def close(self):
+		self.db.close()
+
+	##### building
+
+	def _known(self):
+		return dict((row["path"], (row["size"], row["mtime"])) for row in self.db.execute("SELECT path, size, mtime FROM frames"))
+
+	def scan(self, dirs, reader = read_header, threads = 16):
+		known = self._known()
+		pending = []
+
+		for dir in dirs:
+			for root, subdirs, files in os.walk(dir):
+				for f in files:
+					if f.startswith(".") or not f.lower().endswith((".fits", ".fts", ".fits.gz")):
+						continue
+					path = os.path.abspath(os.path.join(root, f))
+					stat = os.stat(path)
+					if known.get(path) == (stat.st_size, int(stat.st_mtime)):
+						continue
+					pending.append(path)
+
+		def read(path):
+			try:
+				return reader(path)
+			except (IOError, OSError, EOFError) as e:
+				return e
+
+		# a file whose header cannot be read or lacks an observation time is skipped with a warning
+		# (and retried on the next scan) instead of aborting the whole build
+		records = []
+		for path, header in zip(pending, scan_files(pending, threads, read)):
+			try:
+				if isinstance(header, Exception):
+					raise ValueError("unreadable header (%s)" % header)
+				records.append(header_record(path, header))
+			except (ValueError, TypeError) as e:
+				warnings.warn("Skipping %s: %s" % (path, e))
+
+		self.add(records)
+		return len(records)
+
+	def add(self, records):
+		with self.db:
+			self.db.executemany("INSERT OR REPLACE INTO frames (%s) VALUES (%s)" % (", ".join(COLUMNS), ", ".join("?" * len(COLUMNS))),
+								[[record[c] for c in COLUMNS] for record in records])
+
+	def prune(self):
+		missing = [row["path"] for row in self.db.execute("SELECT path FROM frames") if not os.path.isfile(row["path"])]
+		with self.db:
+			self.db.executemany("DELETE FROM frames WHERE path = ?", [[path] for path in missing])
+			self.db.executemany("DELETE FROM quarantine WHERE path = ?", [[path] for path in missing])
+		return len(missing)
+
+	##### quarantine
+
+	def quarantine(self, flags):
+		with self.db:
+			self.db.executemany("INSERT OR REPLACE INTO quarantine (path, reason) VALUES (?, ?)",
+								[[os.path.abspath(path), reason] for path, reason in flags.items()])
+
+	def release(self, paths = None):
+		with self.db:
+			if paths is None:
+				self.db.execute("DELETE FROM quarantine")
+			else:
+				self.db.executemany("DELETE FROM quarantine WHERE path = ?", [[os.path.abspath(path)] for path in paths])
+
+	def quarantined(self, channel = None):
+		if channel is None:
+			return self.db.execute("SELECT q.path, q.reason, f.channel FROM quarantine q LEFT JOIN frames f ON f.path = q.path ORDER BY f.t").fetchall()
+		return self.db.execute("SELECT q.path, q.reason, f.channel FROM quarantine q JOIN frames f ON f.path = q.path WHERE f.channel = ? ORDER BY f.t", (channel,)).fetchall()
+
+	##### queries
+
+	def paths(self):
+		return set(row[0] for row in self.db.execute("SELECT path FROM frames"))
+
+	def channels(self):
+		return [row[0] for row in self.db.execute("SELECT DISTINCT channel FROM frames ORDER BY channel")]
+
+	def frames(self, channel, quarantined = False):
+		if quarantined:
+			return self.db.execute("SELECT * FROM frames WHERE channel = ? ORDER BY t", (channel,)).fetchall()
+		return self.db.execute("SELECT * FROM frames WHERE channel = ? AND %s ORDER BY t" % VISIBLE, (channel,)).fetchall()
+
+	def files(self, channel):
+		return [row["path"] for row in self.frames(channel)]
+
+	def range(self, channel, start, end):
+		return self.db.execute("SELECT * FROM frames WHERE channel = ? AND t >= ? AND t <= ? AND %s ORDER BY t" % VISIBLE,
+							   (channel, to_seconds(start), to_seconds(end))).fetchall()
+
+	def nearest(self, channel, when, tolerance = None):
+		t = to_seconds(when)
+		before = self.db.execute("SELECT * FROM frames WHERE channel = ? AND t <= ? AND %s ORDER BY t DESC LIMIT 1" % VISIBLE, (channel, t)).fetchone()
+		after = self.db.execute("SELECT * FROM frames WHERE channel = ? AND t >= ? AND %s ORDER BY t ASC LIMIT 1" % VISIBLE, (channel, t)).fetchone()
+		candidates = [row for row in (before, after) if row is not None]
+		if len(candidates) == 0:
+			return None
+		best = min(candidates, key = lambda row: abs(row["t"] - t))
+		if tolerance is not None and abs(best["t"] - t) > tolerance:
+			return None
+		return best
@@ -0,0 +1,55 @@
+# Registry of AIA/HMI channels and a driver that runs per-channel work in a process pool
+
+from collections import OrderedDict
+from multiprocessing import Pool
+
+##### per-channel parameters
+# tolerance:			maximum time offset (s) when aligning this channel to a reference channel
+# raw_vmin/raw_vmax:	structure.py raw render limits (raw_vmax None --> running median of frame maxima)
+# enh_vmax:				structure.py Sobel-magnitude render limit
+# bin_percentile:		structure.py binary low percentile at frame 0, reduced by bin_drift per frame
+# corr:					cstructure.py intensity correction ("log" or "pow")
+# corr_vmax:			cstructure.py corrected render limit
+# corr_threshold:		cstructure.py binary mask threshold on corrected data
+
+CHANNELS = OrderedDict([
+	("AIA94", {"instr" : "AIA", "wav" : 94, "path" : "data/AIA94/", "cmap" : "sdoaia94", "tolerance" : 5,
+			   "raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : None, "bin_percentile" : None, "bin_drift" : None,
+			   "corr" : "log", "corr_vmax" : 8, "corr_threshold" : 2}),
+	("AIA131", {"instr" : "AIA", "wav" : 131, "path" : "data/AIA131/", "cmap" : "sdoaia131", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 130, "bin_percentile" : 94.41, "bin_drift" : 0.015,
+				"corr" : "log", "corr_vmax" : 12, "corr_threshold" : 2.5}),
+	("AIA171", {"instr" : "AIA", "wav" : 171, "path" : "data/AIA171/", "cmap" : "sdoaia171", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 1115, "bin_percentile" : 94.9, "bin_drift" : 0.015,
+				"corr" : "pow", "corr_vmax" : 100000000, "corr_threshold" : 15000000}),
+	("AIA193", {"instr" : "AIA", "wav" : 193, "path" : "data/AIA193/", "cmap" : "sdoaia193", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 1260, "bin_percentile" : 95.4, "bin_drift" : 0.015,
+				"corr" : "pow", "corr_vmax" : 800000000, "corr_threshold" : 30000000}),
+	("AIA211", {"instr" : "AIA", "wav" : 211, "path" : "data/AIA211/", "cmap" : "sdoaia211", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 830, "bin_percentile" : 96.1, "bin_drift" : 0.015,
+				"corr" : "pow", "corr_vmax" : 100000000, "corr_threshold" : 15000000}),
+	("AIA304", {"instr" : "AIA", "wav" : 304, "path" : "data/AIA304/", "cmap" : "sdoaia304", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 625, "bin_percentile" : 97.2, "bin_drift" : 0.025,
+				"corr" : "pow", "corr_vmax" : 50000000, "corr_threshold" : 40000000}),
+	("AIA335", {"instr" : "AIA", "wav" : 335, "path" : "data/AIA335/", "cmap" : "sdoaia335", "tolerance" : 5,
+				"raw_vmin" : 2, "raw_vmax" : None, "enh_vmax" : 220, "bin_percentile" : 99.6, "bin_drift" : 0.015,
+				"corr" : "log", "corr_vmax" : 7, "corr_threshold" : 3.5}),
+	("HMI", {"instr" : "HMI", "wav" : 6173, "path" : "data/HMI/", "cmap" : "gray", "tolerance" : 90,
+			 "raw_vmin" : -125, "raw_vmax" : 125, "enh_vmax" : 125, "bin_percentile" : None, "bin_drift" : None,
+			 "corr" : None, "corr_vmax" : None, "corr_threshold" : None})
+])
+
+AIA_CHANNELS = [name for name in CHANNELS if CHANNELS[name]["instr"] == "AIA"]
+
+def run_channels(work, names, processes = None):
+	if processes == 1 or len(names) == 1:
+		return OrderedDict((name, work(name)) for name in names)
+
+	pool = Pool(processes or len(names))
+	try:
+		results = pool.map(work, names)
+	finally:
+		pool.close()
+		pool.join()
+
+	return OrderedDict(zip(names, results))
@@ -0,0 +1,76 @@
+# Contour areas, largest-contour selection and polygon rasterization into boolean masks
+
+from skimage import measure
+import numpy as np
+
+def contour_areas(contours):
+	# shoelace area of every contour at once; contours are (n, 2) arrays of (row, col) vertices
+	if len(contours) == 0:
+		return np.zeros(0)
+	lengths = np.array([len(c) for c in contours])
+	vertices = np.concatenate(contours)
+	starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+	# index of each vertex's successor within its own contour (np.roll per contour)
+	following = np.arange(len(vertices)) + 1
+	following[starts + lengths - 1] = starts
+
+	cross = vertices[:, 0] * vertices[following, 1] - vertices[following, 0] * vertices[:, 1]
+	return np.abs(np.add.reduceat(cross, starts)) / 2.0
+
+def largest_contours(contours, k = 1):
+	# indices of the k largest contours, one per distinct area, largest first; when there are
+	# fewer than k the largest is repeated so callers can always unpack k entries
+	areas = contour_areas(contours)
+	order = np.argsort(-areas, kind = "mergesort")
+	picked = []
+	for index in order:
+		if len(picked) == k or areas[index] <= 0:
+			break
+		if len(picked) == 0 or areas[index] < areas[picked[-1]]:
+			picked.append(index)
+	if len(contours) > 0:
+		picked += [picked[0] if picked else 0] * (k - len(picked))
+	return picked
+
+def fill_polygon(vertices, shape, out = None):
+	# even-odd scanline fill of a closed (row, col) polygon, sampled at integer pixel centres
+	if out is None:
+		out = np.zeros(shape, dtype = bool)
+	r0 = vertices[:, 0]
+	c0 = vertices[:, 1]
+	r1 = np.roll(r0, -1)
+	c1 = np.roll(c0, -1)
+
+	# every edge crosses the integer rows in [min(r0, r1), max(r0, r1))
+	low = np.ceil(np.minimum(r0, r1)).astype(int)
+	high = np.ceil(np.maximum(r0, r1)).astype(int)
+	low = np.clip(low, 0, shape[0])
+	high = np.clip(high, 0, shape[0])
+	counts = np.maximum(high - low, 0)
+	if counts.sum() == 0:
+		return out
+
+	edge = np.repeat(np.arange(len(r0)), counts)
+	rows = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + low[edge]
+	cols = c0[edge] + (rows - r0[edge]) * (c1[edge] - c0[edge]) / (r1[edge] - r0[edge])
+
+	# pair up sorted crossings on each row into [start, stop) spans
+	order = np.lexsort((cols, rows))
+	rows = rows[order][::2]
+	start = np.clip(np.ceil(cols[order][::2]).astype(int), 0, shape[1])
+	stop = np.clip(np.ceil(cols[order][1::2]).astype(int), 0, shape[1])
+
+	spans = np.zeros((shape[0], shape[1] + 1), dtype = np.int32)
+	np.add.at(spans, (rows, start), 1)
+	np.add.at(spans, (rows, stop), -1)
+	out |= np.cumsum(spans, axis = 1)[:, :shape[1]] > 0
+	return out
+
+def contour_mask(mask, k = 1, level = 0.5):
+	# union of the filled k largest contours of mask
+	contours = measure.find_contours(mask, level)
+	out = np.zeros(mask.shape, dtype = bool)
+	for index in largest_contours(contours, k):
+		fill_polygon(contours[index], mask.shape, out)
+	return out
@@ -0,0 +1,96 @@
+# Duplicate region suppression: near-coincident detections in the region database matched with a KD-tree
+
+from collections import OrderedDict
+from datetime import datetime
+from scipy.spatial import cKDTree
+import numpy as np
+
+PIXEL_TOLERANCE = 20.0 # px between detections of the same region
+ANGLE_TOLERANCE = 0.7 # heliographic degrees, about 20 AIA pixels at disk centre
+TIME_TOLERANCE = 120.0 # s between detections of the same region
+RSUN = 960.0 # arcsec, apparent solar radius used to deproject helioprojective positions
+EPOCH = datetime(1970, 1, 1)
+
+def load_regions(path):
+	# header line, raw row lines, and the columns needed for matching as arrays; TRACK is None
+	# for databases written without tracking
+	with open(path) as db:
+		lines = db.readlines()
+	header, rows = lines[0], [line for line in lines[1:] if line.strip() != ""]
+	names = header.strip().split(",")
+	fields = [row.strip().split(",") for row in rows]
+
+	columns = {"ID" : np.array([int(f[0]) for f in fields], dtype = int),
+			   "TIME" : np.array([(datetime.strptime(f[1] + " " + f[2], "%Y-%m-%d %H:%M:%S") - EPOCH).total_seconds() for f in fields]),
+			   "PXL_X" : np.array([float(f[3]) for f in fields]),
+			   "PXL_Y" : np.array([float(f[4]) for f in fields]),
+			   "HPC_X" : np.array([float(f[5]) if len(f) > 6 else np.nan for f in fields]),
+			   "HPC_Y" : np.array([float(f[6]) if len(f) > 6 else np.nan for f in fields]),
+			   "TRACK" : None}
+	if "TRACK" in names:
+		n = names.index("TRACK")
+		columns["TRACK"] = np.array([int(f[n]) for f in fields], dtype = int)
+	return header, rows, columns
+
+def heliographic(hpc_x, hpc_y):
+	# (lon, lat) in radians of a helioprojective position, in the plain orthographic projection
+	lat = np.arcsin(np.clip(hpc_y / RSUN, -1, 1))
+	lon = np.arcsin(np.clip(hpc_x / (RSUN * np.cos(lat)), -1, 1))
+	return lon, lat
+
+def rotation_rate(lat):
+	# Snodgrass differential rotation rate in deg / day
+	sin2 = np.sin(lat)**2
+	return 14.713 - 2.396 * sin2 - 1.787 * sin2**2
+
+def derotate(hpc_x, hpc_y, seconds, reference):
+	# heliographic (lon, lat) in degrees, carried back to the reference time with the
+	# Snodgrass differential rotation rate, so a region keeps its coordinates as it rotates
+	lon, lat = heliographic(hpc_x, hpc_y)
+	return np.degrees(lon) - rotation_rate(lat) * (seconds - reference) / 86400., np.degrees(lat)
+
+def clusters(points, ids, tracks = None):
+	# each region, in recorded order, seeds a cluster of the unclaimed regions with a row within unit
+	# distance of one of its rows. Only the seed is compared against, so a region seen frame after
+	# frame never chains into one cluster spanning its whole lifetime. Rows sharing an ID (the
+	# channels of one region) stay together; rows sharing a TRACK are never merged. Returns the
+	# seed ID of every row.
+	tree = cKDTree(points)
+	labels = np.full(len(points), -1, dtype = int)
+	regions = OrderedDict()
+	for row in np.argsort(ids, kind = "mergesort"):
+		regions.setdefault(ids[row], []).append(row)
+
+	for id, rows in regions.items():
+		if labels[rows[0]] >= 0:
+			continue
+		labels[rows] = id
+		seed_tracks = set() if tracks is None else set(tracks[rows])
+		for near in tree.query_ball_point(points[rows], 1.0):
+			for row in near:
+				if labels[row] < 0 and (tracks is None or tracks[row] not in seed_tracks):
+					labels[regions[ids[row]]] = id
+	return labels
+
+def dedupe(path, coordinates = "pixel", time_tolerance = TIME_TOLERANCE):
+	# rewrites the database keeping one region per cluster; returns (kept, total) row counts and
+	# the IDs of the regions removed
+	header, rows, columns = load_regions(path)
+	if len(rows) == 0:
+		return 0, 0, []
+
+	t = columns["TIME"] / time_tolerance
+	if coordinates == "pixel":
+		x = columns["PXL_X"] / PIXEL_TOLERANCE
+		y = columns["PXL_Y"] / PIXEL_TOLERANCE
+	else:
+		lon, lat = derotate(columns["HPC_X"], columns["HPC_Y"], columns["TIME"], columns["TIME"].min())
+		x, y = lon / ANGLE_TOLERANCE, lat / ANGLE_TOLERANCE
+
+	ids = columns["ID"]
+	labels = clusters(np.column_stack((x, y, t)), ids, columns["TRACK"])
+	keep = [row for row in range(len(rows)) if ids[row] == labels[row]]
+	with open(path, "w") as db:
+		db.write(header)
+		db.write("".join(rows[row] if rows[row].endswith("\n") else rows[row] + "\n" for row in keep))
+	return len(keep), len(rows), sorted(set(int(id) for id in ids[ids != labels]))
@@ -0,0 +1,34 @@
+# Solar disk geometry: centre and radius once per frame, one vectorized on-disk test for all candidates, cached disk masks
+
+from collections import OrderedDict
+import numpy as np
+
+CACHE_SIZE = 8
+MASKS = OrderedDict()
+
+def disk_geometry(frame):
+	# (row, col) of the disk centre and the radius, in pixels, from a map's header
+	center = np.array([int(frame.reference_pixel[1].value),
+					   int(frame.reference_pixel[0].value)])
+	radius = (frame.rsun_obs / frame.scale[0]).value
+	return center, radius
+
+def on_disk(points, center, radius, margin = 0.0):
+	# boolean per (row, col) point: closer than radius - margin to the centre
+	points = np.asarray(points, dtype = float).reshape(-1, 2)
+	return np.hypot(points[:, 0] - center[0], points[:, 1] - center[1]) < radius - margin
+
+def disk_mask(shape, center, radius, margin = 0.0):
+	# read-only boolean image of on_disk, built once per (shape, center, radius, margin)
+	key = (tuple(shape), tuple(int(c) for c in center), round(float(radius), 3), float(margin))
+	if key in MASKS:
+		mask = MASKS.pop(key)
+	else:
+		rows, cols = np.ogrid[: shape[0], : shape[1]]
+		mask = (rows - center[0]) ** 2 + (cols - center[1]) ** 2 < (radius - margin) ** 2
+		mask.setflags(write = False)
+	MASKS[key] = mask
+
+	while len(MASKS) > CACHE_SIZE:
+		MASKS.popitem(last = False)
+	return mask
@@ -0,0 +1,183 @@
+# Manifest-driven, resumable bulk downloader for JSOC (or any HTTP) file lists
+
+from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
+import json
+import os
+import shutil
+import socket
+import time
+
+try:
+	from http.client import HTTPException
+	from urllib.request import Request, urlopen
+	from urllib.error import HTTPError, URLError
+except ImportError:
+	from httplib import HTTPException
+	from urllib2 import HTTPError, Request, URLError, urlopen
+
+CHUNK = timedelta(days = 1) # one export request per series/wavelength/segment per day
+BLOCK = 1 << 20
+RETRIES = 3
+TIMEOUT = 60
+BACKOFF = 2.0 # s before the second attempt, doubled before each later one
+
+DEST = {"aia" : "resources/aia-fits-files", "hmi" : "resources/hmi-fits-files"}
+
+##### planning
+
+def parse_time(text):
+	return datetime.strptime(text.replace("T", " ").rstrip("Z"), "%Y-%m-%d %H:%M:%S")
+
+def load_manifest(path):
+	# {"email" : ..., "requests" : [{"start", "end", "series", "cadence", "wavelengths" : [...], "segments" : [...]}, ...]}
+	with open(path) as f:
+		return json.load(f)
+
+def plan(manifest, chunk = CHUNK):
+	jobs = []
+	for request in manifest["requests"]:
+		start = parse_time(request["start"])
+		end = parse_time(request["end"])
+		for wavelength in request.get("wavelengths") or [None]:
+			for segment in request.get("segments") or [None]:
+				t = start
+				while t < end:
+					jobs.append({"series" : request["series"],
+								 "start" : t,
+								 "end" : min(t + chunk, end),
+								 "cadence" : request.get("cadence"),
+								 "wavelength" : wavelength,
+								 "segment" : segment,
+								 "dest" : request.get("dest", DEST[request["series"].split(".")[0]])})
+					t += chunk
+	return jobs
+
+def jsoc_query(job):
+	query = "%s[%s-%s" % (job["series"], job["start"].strftime("%Y.%m.%d_%H:%M:%S_TAI"), job["end"].strftime("%Y.%m.%d_%H:%M:%S_TAI"))
+	if job["cadence"]:
+		query += "@%ds" % job["cadence"]
+	query += "]"
+	if job["wavelength"]:
+		query += "[%d]" % job["wavelength"]
+	if job["segment"]:
+		query += "{%s}" % job["segment"]
+	return query
+
+def jsoc_resolver(email):
+	# job --> [(url, filename), ...] through a JSOC url export
+	import drms
+	client = drms.Client(email = email)
+
+	def resolve(job):
+		export = client.export(jsoc_query(job), method = "url", protocol = "fits")
+		export.wait()
+		return [(export.urls["url"][k], export.urls["filename"][k]) for k in range(len(export.urls))]
+
+	return resolve
+
+def resolve(jobs, resolver, known = (), skip = lambda filename: filename.endswith(".spikes.fits")):
+	# expands jobs into (url, dest path) transfers, dropping files already on disk or in the catalog
+	known = set(os.path.basename(path) for path in known)
+	transfers = []
+	for job in jobs:
+		for url, filename in resolver(job):
+			path = os.path.join(job["dest"], filename)
+			if skip(filename) or filename in known or os.path.isfile(path):
+				continue
+			transfers.append((url, path))
+	return transfers
+
+##### transfer
+
+def total_size(content_range):
+	# the complete length from a "bytes a-b/total" or "bytes */total" header, None if unknown
+	if content_range is None:
+		return None
+	total = content_range.split("/")[-1].strip()
+	return int(total) if total.isdigit() else None
+
+def fetch(url, path, retries = RETRIES, timeout = TIMEOUT, backoff = BACKOFF):
+	# downloads into path.part, resuming with a Range request; returns the verified size
+	partial = path + ".part"
+	if not os.path.isdir(os.path.dirname(path) or "."):
+		os.makedirs(os.path.dirname(path))
+
+	for attempt in range(retries):
+		if attempt > 0 and backoff > 0:
+			time.sleep(backoff * 2 ** (attempt - 1))
+
+		offset = os.path.getsize(partial) if os.path.isfile(partial) else 0
+		request = Request(url)
+		if offset > 0:
+			request.add_header("Range", "bytes=%d-" % offset)
+
+		try:
+			response = urlopen(request, timeout = timeout)
+		except HTTPError as e:
+			if e.code == 416 and offset > 0:
+				# nothing left to send: either the partial is already complete, or it is stale
+				if total_size(e.headers.get("Content-Range")) == offset:
+					os.rename(partial, path)
+					return offset
+				os.remove(partial)
+			if attempt == retries - 1:
+				raise
+			continue
+		except (URLError, HTTPException, socket.timeout, socket.error): # refused, reset or timed out before a response
+			if attempt == retries - 1:
+				raise
+			continue
+
+		try:
+			status = response.getcode()
+			length = response.info().get("Content-Length")
+			if status == 206:
+				expected = total_size(response.info().get("Content-Range"))
+				mode = "ab"
+			else:
+				expected = int(length) if length is not None else None
+				mode = "wb"
+			with open(partial, mode) as f:
+				shutil.copyfileobj(response, f, BLOCK)
+		except (IOError, OSError, HTTPException, socket.timeout): # dropped mid-body; the next attempt resumes
+			if attempt == retries - 1:
+				raise
+			continue
+		finally:
+			response.close()
+
+		size = os.path.getsize(partial)
+		if expected is not None and size != expected:
+			if attempt == retries - 1:
+				raise IOError("%s: received %d of %d bytes" % (url, size, expected))
+			continue
+
+		os.rename(partial, path)
+		return size
+
+def download(transfers, workers = 4, retries = RETRIES, report = None, backoff = BACKOFF):
+	# bounded worker pool; returns ([(path, size), ...], [(path, error), ...])
+	def work(transfer):
+		url, path = transfer
+		try:
+			result = (path, fetch(url, path, retries, backoff = backoff), None)
+		except Exception as e:
+			result = (path, None, str(e))
+		if report is not None:
+			report(*result)
+		return result
+
+	if len(transfers) == 0:
+		return [], []
+
+	pool = ThreadPool(min(workers, len(transfers)))
+	try:
+		results = pool.map(work, transfers)
+	finally:
+		pool.close()
+		pool.join()
+
+	done = [(path, size) for path, size, error in results if error is None]
+	failed = [(path, error) for path, size, error in results if error is not None]
+	return done, failed
@@ -0,0 +1,98 @@
+# Header-only FITS metadata scanner (plain and Rice tile-compressed HDUs)
+
+from multiprocessing.pool import ThreadPool
+from os import listdir
+from os.path import isfile, join
+import gzip
+
+BLOCK = 2880
+CARD = 80
+
+KEYWORDS = ["DATE-OBS", "T_OBS", "WAVELNTH", "EXPTIME", "CRPIX1", "CRPIX2", "CDELT1", "CDELT2",
+			"RSUN_OBS", "INSTRUME", "TELESCOP", "QUALITY", "NAXIS1", "NAXIS2", "ZNAXIS1", "ZNAXIS2",
+			"BITPIX", "ZBITPIX", "DATAMIN", "DATAMAX", "MISSVALS", "TOTVALS", "SATVALS"]
+
+def parse_value(raw):
+	raw = raw.strip()
+	if raw.startswith("'"):
+		end = raw.find("'", 1)
+		while end != -1 and raw[end + 1 : end + 2] == "'":
+			end = raw.find("'", end + 2)
+		return raw[1 : end].replace("''", "'").rstrip()
+	raw = raw.split("/")[0].strip()
+	if raw == "T":
+		return True
+	if raw == "F":
+		return False
+	try:
+		return int(raw)
+	except ValueError:
+		pass
+	try:
+		return float(raw.replace("D", "E"))
+	except ValueError:
+		return raw
+
+def read_hdu_header(f):
+	header = {}
+	while True:
+		block = f.read(BLOCK)
+		if len(block) < BLOCK:
+			return None
+		block = block.decode("ascii", "replace")
+		for i in range(0, BLOCK, CARD):
+			card = block[i : i + CARD]
+			key = card[:8].strip()
+			if key == "END":
+				return header
+			if card[8:10] == "= ":
+				header[key] = parse_value(card[10:])
+
+def data_size(header):
+	naxis = header.get("NAXIS", 0)
+	if naxis == 0:
+		return 0
+	size = 1
+	for i in range(1, naxis + 1):
+		size *= header.get("NAXIS%d" % i, 0)
+	size = abs(header.get("BITPIX", 8)) // 8 * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + size)
+	return (size + BLOCK - 1) // BLOCK * BLOCK
+
+def read_header(path):
+	opener = gzip.open if path.endswith(".gz") else open
+	merged = {}
+
+	with opener(path, "rb") as f:
+		while True:
+			header = read_hdu_header(f)
+			if header is None:
+				break
+			merged.update(header)
+			if header.get("ZIMAGE", False) or (header.get("NAXIS", 0) > 0 and header.get("XTENSION", "IMAGE") == "IMAGE"):
+				break
+			f.seek(data_size(header), 1)
+
+	return merged
+
+def read_metadata(path, keywords = KEYWORDS):
+	header = read_header(path)
+	return dict((key, header[key]) for key in keywords if key in header)
+
+def fits_files(dir):
+	files = [join(dir, f) for f in listdir(dir) if isfile(join(dir, f)) and not f.startswith(".")]
+	files.sort()
+	return [f for f in files if f.lower().endswith((".fits", ".fts", ".fits.gz"))]
+
+def scan_files(paths, threads = 16, reader = read_header):
+	if len(paths) == 0:
+		return []
+	pool = ThreadPool(min(threads, len(paths)))
+	try:
+		return pool.map(reader, paths)
+	finally:
+		pool.close()
+		pool.join()
+
+def scan_dir(dir, threads = 16, reader = read_header):
+	paths = fits_files(dir)
+	return list(zip(paths, scan_files(paths, threads, reader)))
@@ -0,0 +1,78 @@
+# HMI to AIA alignment: cached full frames per timestamp, or just the window a cutout needs
+
+from collections import OrderedDict
+from scipy.ndimage import map_coordinates
+from scipy.ndimage import zoom as interpolate
+import numpy as np
+
+CACHE_SIZE = 2
+SHAPE = (4096, 4096)
+
+def hmi_scale(hmi, aia):
+	return float("%.3f" % (hmi.scale[0] / aia.scale[0]).value)
+
+def align_full(data, scale, center, shape = SHAPE, fill = np.nan):
+	# zoom HMI onto the AIA plate scale, rotate by 180 degrees and paste it centred on center (row, col)
+	aligned = np.full(shape, fill, dtype = float)
+	zoomed = np.flip(interpolate(data, scale, order = 1), (0, 1))
+
+	rows, cols = zoomed.shape
+	r0 = center[0] - 1 - rows // 2
+	c0 = center[1] - 1 - cols // 2
+	r1, c1 = max(r0, 0), max(c0, 0)
+	r2, c2 = min(r0 + rows, shape[0]), min(c0 + cols, shape[1])
+	aligned[r1 : r2, c1 : c2] = zoomed[r1 - r0 : r2 - r0, c1 - c0 : c2 - c0]
+	return aligned
+
+def window_coordinates(shape, scale, center, rows, cols):
+	# affine map from AIA canvas pixels back to HMI pixels, equivalent to align_full:
+	# zoom (corner-aligned, as scipy's zoom), 180 degree flip, then the paste offset
+	coords = []
+	for axis, (start, stop) in enumerate([rows, cols]):
+		n = int(round(shape[axis] * scale))
+		origin = center[axis] - 1 - n // 2
+		step = (shape[axis] - 1) / float(n - 1)
+		zoomed = n - 1 - (np.arange(start, stop) - origin)
+		inside = (zoomed >= 0) & (zoomed <= n - 1)
+		coords.append(np.where(inside, zoomed * step, -2.))
+	return coords
+
+def align_window(data, scale, center, rows, cols, out = None, fill = np.nan):
+	# samples only the (rows, cols) window of the aligned canvas, e.g. a region cutout
+	r, c = window_coordinates(data.shape, scale, center, rows, cols)
+	if out is None:
+		out = np.empty((len(r), len(c)), dtype = float)
+	grid = np.array(np.broadcast_arrays(r[:, np.newaxis], c[np.newaxis, :]))
+	map_coordinates(data, grid, output = out, order = 1, mode = "constant", cval = fill)
+	out[(grid < 0).any(axis = 0)] = fill
+	return out
+
+class HMIAligner(object):
+
+	def __init__(self, cache_size = CACHE_SIZE, shape = SHAPE, fill = np.nan):
+		self.CACHE_SIZE = cache_size
+		self.SHAPE = shape
+		self.FILL = fill
+		self.cache = OrderedDict()
+		self.buffers = {}
+
+	def aligned(self, hmi, aia, center):
+		scale = hmi_scale(hmi, aia)
+		key = (str(hmi.date), scale, tuple(center))
+
+		if key in self.cache:
+			frame = self.cache.pop(key)
+		else:
+			frame = align_full(hmi.data, scale, center, self.SHAPE, self.FILL)
+		self.cache[key] = frame
+
+		while len(self.cache) > self.CACHE_SIZE:
+			self.cache.popitem(last = False)
+		return frame
+
+	def window(self, hmi, aia, center, rows, cols):
+		# the returned buffer is reused by the next window of the same size
+		shape = (rows[1] - rows[0], cols[1] - cols[0])
+		if shape not in self.buffers:
+			self.buffers[shape] = np.empty(shape, dtype = float)
+		return align_window(hmi.data, hmi_scale(hmi, aia), center, rows, cols, self.buffers[shape], self.FILL)
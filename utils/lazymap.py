@@ -0,0 +1,52 @@
+# Lazily loaded map sequence: frames are opened on [i] access and kept in a small LRU
+
+from astropy.io import fits
+from collections import OrderedDict
+import sunpy.map as smap
+
+CACHE_SIZE = 4
+
+def open_frame(path):
+	# uncompressed image data stays memory-mapped; tile-compressed data is decoded here, once
+	with fits.open(path, memmap = True) as hdul:
+		hdu = hdul[len(hdul) - 1]
+		return smap.Map((hdu.data, hdu.header))
+
+class LazyMapSequence(object):
+
+	def __init__(self, paths, cache_size = CACHE_SIZE, loader = open_frame):
+		self.PATHS = list(paths)
+		self.CACHE_SIZE = cache_size
+		self.LOADER = loader
+		self.cache = OrderedDict()
+
+	def __len__(self):
+		return len(self.PATHS)
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return LazyMapSequence(self.PATHS[i], self.CACHE_SIZE, self.LOADER)
+		if i < 0:
+			i += len(self)
+		if i < 0 or i >= len(self):
+			raise IndexError("frame %d out of range" % i)
+
+		if i in self.cache:
+			frame = self.cache.pop(i)
+		else:
+			frame = self.LOADER(self.PATHS[i])
+		self.cache[i] = frame
+
+		while len(self.cache) > self.CACHE_SIZE:
+			self.cache.popitem(last = False)
+		return frame
+
+	def path(self, i):
+		return self.PATHS[i]
+
+	def clear(self):
+		self.cache.clear()
@@ -0,0 +1,115 @@
+# Region mask fitting: closed-form elliptical masks from ranked pixel distances, and
+# contour or connected-component masks of the dominant blobs
+
+from contours import contour_mask
+from scipy import ndimage
+import numpy as np
+
+CONNECTIVITY = np.ones((3,3), dtype = bool) # diagonal neighbours join, as in the contour trace
+
+def needed(total, fraction):
+	# smallest pixel count k with k / total >= fraction
+	k = int(np.ceil(fraction * total))
+	while k > 0 and (k - 1) / total >= fraction:
+		k -= 1
+	while k < total and k / total < fraction:
+		k += 1
+	return k
+
+def ellipse_grid(shape, center):
+	return np.ogrid[-center[0]:shape[0] - center[0], -center[1]:shape[1] - center[1]]
+
+def inside(x, y, a, b):
+	return x**2/a**2 + y**2/b**2 <= 1
+
+def fit_ellipse(r_mask, center, thresholds = (1.0, 0.94, 0.88), rad = 2.0):
+	# Same result as growing a circle from rad until it holds thresholds[0] of the mask pixels,
+	# then shrinking a (horizontal) and b (vertical) one pixel at a time until coverage drops
+	# below thresholds[1] and thresholds[2]. Returns (mask_in, mask_out, a, b).
+	y, x = ellipse_grid(r_mask.shape, center)
+	py, px = np.nonzero(r_mask == 1)
+	py = (py - center[0]).astype(float)
+	px = (px - center[1]).astype(float)
+	total = float(len(px))
+
+	if total > 0:
+		# circle: radius is the k-th smallest pixel distance, rounded up onto the rad + n grid
+		k = needed(total, thresholds[0])
+		d = np.partition(px**2 + py**2, k - 1)[k - 1] if k > 0 else 0.
+		low = rad
+		rad += max(0., np.ceil(np.sqrt(d) - rad))
+		while rad > low and (rad - 1)**2 >= d:
+			rad -= 1.
+		while rad**2 < d:
+			rad += 1.
+	a = b = rad
+
+	for axis, fraction in [(0, thresholds[1]), (1, thresholds[2])]:
+		if total == 0:
+			break
+		k = needed(total, fraction)
+		if axis == 0:
+			with np.errstate(divide = "ignore", invalid = "ignore"):
+				limit = np.abs(px) / np.sqrt(1 - py**2/b**2)
+			limit[py**2 > b**2] = np.inf
+		else:
+			with np.errstate(divide = "ignore", invalid = "ignore"):
+				limit = np.abs(py) / np.sqrt(1 - px**2/a**2)
+			limit[px**2 > a**2] = np.inf
+		limit[np.isnan(limit)] = 0.
+
+		# largest axis length on the start - n grid whose ellipse covers fewer than k pixels
+		start = a if axis == 0 else b
+		cut = np.partition(limit, k - 1)[k - 1] if k > 0 else -np.inf
+		length = start if start < cut else start - (np.floor(start - cut) + 1)
+
+		# settle floating-point ties against the exact test
+		def covered(length):
+			if length <= 0:
+				return 0
+			return np.count_nonzero(inside(px, py, length, b) if axis == 0 else inside(px, py, a, length))
+		while length < start and covered(length + 1) < k:
+			length += 1
+		while length > 1 and covered(length) >= k:
+			length -= 1
+		length = max(length, 1.)
+
+		if axis == 0:
+			a = length
+		else:
+			b = length
+
+	mask_in = inside(x, y, a, b)
+	return mask_in, ~mask_in, a, b
+
+def component_mask(mask, k = 1, weights = None, fill = True, closing = 0):
+	# union of the k largest 8-connected components of mask, ranked by pixel count or, when
+	# weights (e.g. the image) are given, by summed |weights|; holes filled, optionally closed
+	labels, n = ndimage.label(mask > 0.5, structure = CONNECTIVITY)
+	if n == 0:
+		return np.zeros(mask.shape, dtype = bool)
+
+	index = np.arange(1, n + 1)
+	if weights is None:
+		score = np.bincount(labels.ravel(), minlength = n + 1)[1:]
+	else:
+		score = ndimage.sum(np.abs(np.nan_to_num(weights)), labels, index)
+
+	keep = np.zeros(n + 1, dtype = bool)
+	keep[index[np.argsort(-score, kind = "mergesort")[:k]]] = True
+	out = keep[labels]
+
+	if fill:
+		out = ndimage.binary_fill_holes(out)
+	if closing > 0:
+		out = ndimage.binary_closing(out, CONNECTIVITY, iterations = closing)
+	return out
+
+MASKING = {
+	"contour" : lambda mask, k, weights: contour_mask(mask, k),
+	"components" : lambda mask, k, weights: component_mask(mask, k, weights),
+}
+
+def region_mask(mask, k = 1, masking = "contour", weights = None):
+	# the c-mask step of the region scripts through either engine, selected per run
+	return MASKING[masking](mask, k, weights)
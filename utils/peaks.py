@@ -0,0 +1,114 @@
+# Bright-region detection: local maxima at least threshold above the window minimum, as with
+# maximum_filter / minimum_filter, found on a block-reduced image and confirmed at full resolution
+
+from scipy import ndimage
+import numpy as np
+
+BLOCK = 32 # largest reduction factor used for big windows
+
+def extremes(dtype):
+	if np.issubdtype(dtype, np.integer):
+		return np.iinfo(dtype).min, np.iinfo(dtype).max
+	return -np.inf, np.inf
+
+def running(data, left, right, func, fill, axis = -1):
+	# van Herk / Gil-Werman running func (np.maximum or np.minimum) over data[i - left : i + right + 1]
+	# along axis, cells outside data ignored; a few ufunc passes whatever the window length
+	a = np.moveaxis(data, axis, -1)
+	n = a.shape[-1]
+	w = left + right + 1
+	front, back = max(left, 0), max(right, 0)
+	m = -(-(front + n + back) // w) * w
+
+	padded = np.full(a.shape[:-1] + (m,), fill, dtype = a.dtype)
+	padded[..., front : front + n] = a
+	blocks = padded.reshape(a.shape[:-1] + (m // w, w))
+	g = func.accumulate(blocks, axis = -1).reshape(padded.shape)
+	h = func.accumulate(blocks[..., ::-1], axis = -1)[..., ::-1].reshape(padded.shape)
+
+	start = np.arange(n) + front - left
+	return np.moveaxis(func(h[..., start], g[..., start + w - 1]), -1, axis)
+
+def window_filter(data, size, func, fill):
+	# equals scipy's maximum_filter / minimum_filter(data, size): on reflected borders the
+	# window extremum is the extremum of the window clipped to the image
+	left, right = size // 2, size - 1 - size // 2
+	return running(running(data, left, right, func, fill, 0), left, right, func, fill, 1)
+
+def maxima_mask(data, size, threshold):
+	# the original full-resolution test, with O(1)-per-pixel running filters
+	low, high = extremes(data.dtype)
+	data_max = window_filter(data, size, np.maximum, low)
+	data_min = window_filter(data, size, np.minimum, high)
+	return (data == data_max) & ((data_max - data_min) > threshold)
+
+def block_extremes(data, factor):
+	low, high = extremes(data.dtype)
+	rows, cols = -(-data.shape[0] // factor), -(-data.shape[1] // factor)
+	padded = np.full((rows * factor, cols * factor), low, dtype = data.dtype)
+	padded[: data.shape[0], : data.shape[1]] = data
+	block_max = padded.reshape(rows, factor, cols, factor).max(axis = (1, 3))
+	padded[data.shape[0] :, :] = high
+	padded[:, data.shape[1] :] = high
+	block_min = padded.reshape(rows, factor, cols, factor).min(axis = (1, 3))
+	return block_max, block_min
+
+def reduced_maxima_mask(data, size, threshold, factor):
+	# A pixel that is its window's maximum also tops its own block and every block lying
+	# inside all windows of that block; its window minimum is no lower than the smallest block
+	# touching any of them. Blocks passing both bounds are checked exactly, pixel by pixel.
+	low, high = extremes(data.dtype)
+	left, right = size // 2, size - 1 - size // 2
+	block_max, block_min = block_extremes(data, factor)
+
+	inner = (-(-(factor - 1 - left) // factor), (right + 1 - factor) // factor)
+	outer = (-(-left // factor), (factor - 1 + right) // factor)
+	top = block_max
+	for axis in (0, 1):
+		top = running(top, -inner[0], inner[1], np.maximum, low, axis)
+	bottom = block_min
+	for axis in (0, 1):
+		bottom = running(bottom, outer[0], outer[1], np.minimum, high, axis)
+
+	blocks = (block_max >= top) & (block_max.astype(float) - bottom > threshold)
+	mask = np.zeros(data.shape, dtype = bool)
+	for I, J in zip(*np.nonzero(blocks)):
+		rows = slice(I * factor, (I + 1) * factor)
+		cols = slice(J * factor, (J + 1) * factor)
+		for r, c in zip(*np.nonzero(data[rows, cols] == block_max[I, J])):
+			r, c = r + rows.start, c + cols.start
+			window = data[max(r - left, 0) : r + right + 1, max(c - left, 0) : c + right + 1]
+			mask[r, c] = window.max() == data[r, c] and window.max() - window.min() > threshold
+	return mask
+
+def peak_labels(data, size, threshold, factor = None):
+	# (labeled, num_objects) of the maxima, as ndimage.label gives for the filter-based mask;
+	# data is assumed NaN-free
+	if factor is None:
+		factor = min(BLOCK, size // 4)
+	if factor > 1 and factor <= (size + 1) // 2:
+		mask = reduced_maxima_mask(data, size, threshold, factor)
+	else:
+		mask = maxima_mask(data, size, threshold)
+	return ndimage.label(mask)
+
+def centers(data, labeled, num_objects):
+	# ndimage.center_of_mass(data, labeled, range(1, num_objects + 1)) summed over the labels'
+	# bounding box only, with the same absolute coordinates and summation order
+	boxes = ndimage.find_objects(labeled)
+	r0, c0 = min(b[0].start for b in boxes), min(b[1].start for b in boxes)
+	r1, c1 = max(b[0].stop for b in boxes), max(b[1].stop for b in boxes)
+	crop, labels = data[r0 : r1, c0 : c1], labeled[r0 : r1, c0 : c1]
+	index = range(1, num_objects + 1)
+
+	rows, cols = np.ogrid[r0 : r1, c0 : c1]
+	normalizer = ndimage.sum(crop, labels, index)
+	return np.array([ndimage.sum(crop * rows.astype(float), labels, index) / normalizer,
+					 ndimage.sum(crop * cols.astype(float), labels, index) / normalizer]).T
+
+def find_maxima(data, size, threshold, factor = None):
+	# xy_maxima: integer (row, col) intensity-weighted centres of the maxima, one row per region
+	labeled, num_objects = peak_labels(data, size, threshold, factor)
+	if num_objects == 0:
+		return np.zeros((0, 2), dtype = int)
+	return centers(data, labeled, num_objects).astype(int)
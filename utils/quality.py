@@ -0,0 +1,101 @@
+# Frame quality pass: flags bad frames in the catalog quarantine instead of deleting them
+
+from astropy.io import fits
+from fitsscan import read_metadata, scan_files
+import numpy as np
+import os
+
+# QUALITY bits that mark a frame as unusable, by instrument; the rest (missing pointing or flat
+# records, the MISSVALS levels checked below by fraction) are informational and pass
+QUALITY_MASKS = {
+	"AIA" : 0x8007F800, # > 25% missing, not science mode, eclipse, off-pointed, safe mode, dark, ISS open, calibration; no image
+	"HMI" : 0x80000000 # no image
+}
+EXPTIME_TOLERANCE = 0.5 # allowed fractional deviation from the channel's median exposure
+MISSING_FRACTION = 0.01 # of on-disk pixels
+SATURATED_FRACTION = 0.001 # of on-disk pixels
+SATURATION = {"AIA" : 16000}
+SAMPLE_STRIDE = 8
+
+def frame_sample(path, stride = SAMPLE_STRIDE):
+	# every stride-th pixel of the image; only the touched rows/tiles are read or decoded
+	with fits.open(path, memmap = True) as hdul:
+		hdu = hdul[len(hdul) - 1]
+		try:
+			return np.array(hdu.section[::stride, ::stride], dtype = np.float32)
+		except (AttributeError, TypeError, ValueError, IndexError):
+			return np.array(hdu.data[::stride, ::stride], dtype = np.float32)
+
+def disk_mask(shape, header, stride = SAMPLE_STRIDE):
+	if not all(key in header for key in ["CRPIX1", "CRPIX2", "CDELT1", "RSUN_OBS"]):
+		return np.ones(shape, dtype = bool)
+	y, x = np.ogrid[:shape[0], :shape[1]]
+	radius = header["RSUN_OBS"] / abs(header["CDELT1"]) / stride
+	return (x - (header["CRPIX1"] - 1) / stride) ** 2 + (y - (header["CRPIX2"] - 1) / stride) ** 2 <= radius ** 2
+
+def assess(header, median_exptime = None, sample = None, stride = SAMPLE_STRIDE, quality_mask = None):
+	# quality_mask: QUALITY bits that flag the frame, instead of the instrument's QUALITY_MASKS entry
+	reasons = []
+	instrument = str(header.get("INSTRUME", header.get("TELESCOP", ""))).upper()[:3]
+
+	if quality_mask is None:
+		quality_mask = QUALITY_MASKS.get(instrument, 0xFFFFFFFF)
+	quality = int(header.get("QUALITY", 0)) & quality_mask
+	if quality:
+		reasons.append("quality 0x%08x" % quality)
+
+	exptime = header.get("EXPTIME")
+	if exptime is not None:
+		if exptime <= 0:
+			reasons.append("exposure %.3f s" % exptime)
+		elif median_exptime and abs(exptime / median_exptime - 1) > EXPTIME_TOLERANCE:
+			reasons.append("exposure %.3f s vs median %.3f s" % (exptime, median_exptime))
+
+	total = header.get("TOTVALS")
+	if total:
+		if header.get("MISSVALS", 0) > MISSING_FRACTION * total:
+			reasons.append("missing %.2f%%" % (100. * header["MISSVALS"] / total))
+		if header.get("SATVALS", 0) > SATURATED_FRACTION * total:
+			reasons.append("saturated %.3f%%" % (100. * header["SATVALS"] / total))
+
+	if sample is not None:
+		disk = disk_mask(sample.shape, header, stride)
+		pixels = sample[disk]
+		finite = pixels[np.isfinite(pixels)]
+		if pixels.size > 0:
+			missing = 1. - finite.size / float(pixels.size)
+			if missing > MISSING_FRACTION:
+				reasons.append("sampled missing %.2f%%" % (100. * missing))
+		if finite.size > 0 and instrument in SATURATION:
+			saturated = (finite >= SATURATION[instrument]).mean()
+			if saturated > SATURATED_FRACTION:
+				reasons.append("sampled saturated %.3f%%" % (100. * saturated))
+
+	return reasons
+
+def quality_pass(catalog, channels = None, dirs = None, check_data = True, threads = 8, quality_mask = None):
+	# reassesses the catalogued frames of the given channels, under the given directories, and
+	# quarantines the bad ones; None selects every channel or directory
+	flags = {}
+	dirs = None if dirs is None else tuple(os.path.join(os.path.abspath(dir), "") for dir in dirs)
+
+	for channel in channels or catalog.channels():
+		paths = [row["path"] for row in catalog.frames(channel, quarantined = True)]
+		if dirs is not None:
+			paths = [path for path in paths if path.startswith(dirs)]
+		if len(paths) == 0:
+			continue
+		headers = scan_files(paths, threads, read_metadata)
+		exptimes = [h["EXPTIME"] for h in headers if h.get("EXPTIME", 0) > 0]
+		median_exptime = np.median(exptimes) if len(exptimes) > 0 else None
+
+		def check(k):
+			return assess(headers[k], median_exptime, frame_sample(paths[k]) if check_data else None,
+						  quality_mask = quality_mask)
+
+		for path, reasons in zip(paths, scan_files(range(len(paths)), threads, check)):
+			if reasons:
+				flags[path] = "; ".join(reasons)
+
+	catalog.quarantine(flags)
+	return flags
@@ -1,17 +1,40 @@
+from archive import RegionArchive
+from artifacts import ArtifactStore, STORE_PATH
 from colortext import Color
 from datetime import datetime
+from dedupe import dedupe
 from tqdm import tqdm
+import atexit
 import getpass
 import numpy as np
-import os
-import time
 
 MAIN_DIR = "/Users/%s/Desktop/lmsal" % getpass.getuser()
+FLUSH_ROWS = 200 # finished rows kept in memory before they are appended to the database
+
+# write_image type --> (description, product) for the region-analysis products
+PRODUCTS = [("raw image", "raw-images"),
+			("masked image", "r-masked-images"),
+			("elliptically-masked image", "e-masked-images"),
+			("contour-masked image", "c-masked-images")]
+
+# database columns every region row has, and the ones write_track() adds for tracked runs
+COLUMNS = ["ID", "DATE", "TIME", "PXL_X", "PXL_Y", "HPC_X", "HPC_Y", "PXL_SIZE_X", "PXL_SIZE_Y", "HPC_SIZE_X", "HPC_SIZE_Y",
+		   "304_LOW_THRESH_INTEN", "304_AVG_INTEN", "304_MED_INTEN", "304_MAX_INTEN", "UNSIG_GAUSS", "AVG_GAUSS", "MED_GAUSS"]
+TRACK_COLUMNS = ["TRACK", "KEYFRAME"]
 
 class Recorder(object):
 
-	def __init__(self, database_name = ""):
+	def __init__(self, database_name = "", products = PRODUCTS, compress = False, deferred = False, archive = None,
+				 columns = COLUMNS):
+		# deferred: committed rows and their images are kept in memory, without IDs, for a
+		# coordinating Recorder to merge(); used by frame workers
+		# archive: path of a tar that images stream into as they are stored, closed by close()
+		# columns: the database header, matching the fields the calling script records per row
+		self.DEFERRED = deferred
 		self.DATABASE_NAME = "/Users/%s/Desktop/lmsal/resources/region-data/%s" % (getpass.getuser(), database_name)
+		self.PRODUCTS = products
+		self.ARTIFACTS = None
+		self.ARCHIVE = None
 		self.INFO = Color.RESET + Color.GREEN + Color.BOLD + "[INFO]\t" + Color.RESET + Color.WHITE + Color.BOLD
 		self.INPUT = Color.RESET + Color.RED + Color.BOLD + "[INPUT]\t" + Color.RESET + Color.YELLOW
 		self.INFO_TAB = Color.RESET + Color.BLUE + Color.BOLD + "[INFO]\t==> " + Color.RESET + Color.YELLOW + Color.BOLD
@@ -21,9 +44,23 @@ class Recorder(object):
 		self.WARN = Color.RESET + Color.RED + Color.BOLD + "[WARN]\t" + Color.RESET + Color.YELLOW + Color.BOLD
 		self.NEW_LINE = Color.RESET + Color.WHITE + "\n" + "-" * 75
 
+		# the current region's fields as (format, value) pairs, and finished rows awaiting a flush
+		self.row = []
+		self.rows = []
+		self.images = []
+		self.entries = []
+
+		# 304_* and *_GAUSS statistics are taken over the region's own pixels: inside the elliptical
+		# and contour masks on KEYFRAME = 1 rows, inside the binary masks on KEYFRAME = 0 rows
+		# (tracked regions between keyframes, see tracker.py)
 		if database_name != "":
 			with open(self.DATABASE_NAME, "w") as db:
-				db.write("ID,DATE,TIME,PXL_X,PXL_Y,HPC_X,HPC_Y,PXL_SIZE_X,PXL_SIZE_Y,HPC_SIZE_X,HPC_SIZE_Y,304_LOW_THRESH_INTEN,304_AVG_INTEN,304_MED_INTEN,304_MAX_INTEN,UNSIG_GAUSS,AVG_GAUSS,MED_GAUSS\n")
+				db.write(",".join(columns) + "\n")
+			# per-region images go to one append-only store, recreated with the database
+			self.ARTIFACTS = ArtifactStore("%s/%s" % (MAIN_DIR, STORE_PATH), compress = compress, clear = True)
+			if archive is not None:
+				self.ARCHIVE = RegionArchive(archive)
+			atexit.register(self.flush)
 
 	def info_text(self, text):
 		tqdm.write("\t" + self.INFO + text + Color.RESET + Color.WHITE)
@@ -34,172 +71,205 @@ class Recorder(object):
 	def warn_text(self, text):
 		tqdm.write("\t" + self.WARN + text + Color.RESET + Color.WHITE)
 
+	def record(self, fmt, value):
+		self.row.append((fmt, value))
+
+	def flush(self):
+		# appends every finished row in one write
+		if self.ARTIFACTS is not None:
+			self.ARTIFACTS.flush()
+		if len(self.rows) > 0:
+			with open(self.DATABASE_NAME, "a") as db:
+				db.write("".join(",".join(fmt % value for fmt, value in row) + "\n" for row in self.rows))
+			self.rows = []
+		if self.ARCHIVE is not None:
+			self.ARCHIVE.flush()
+
+	def close(self):
+		# flushes everything and finishes the archive with the database as its last member
+		self.flush()
+		if self.ARCHIVE is not None:
+			print(self.WRITE + "Closing archive '%s'" % self.ARCHIVE.PATH)
+			self.ARCHIVE.close([self.DATABASE_NAME])
+			self.ARCHIVE = None
+
+	def store(self, id, product, channel, data):
+		self.ARTIFACTS.put(id, product, channel, data)
+		if self.ARCHIVE is not None:
+			self.ARCHIVE.add_array(id, product, channel, data)
+
 	def write_ID(self, ID):
-		print self.INFO + "Loop %05d" % ID
-		with open(self.DATABASE_NAME, "a") as db:
-			print self.WRITE + "Recording ID"
-			print self.INFO_TAB + "%05d" % ID
-			db.write("%05d," % ID)
-		self.rest()
+		print(self.INFO + "Loop %05d" % ID)
+		print(self.WRITE + "Recording ID")
+		print(self.INFO_TAB + "%05d" % ID)
+		self.record("%05d", ID)
 
 	def show_instr(self, instr):
-		print self.INFO + instr
+		print(self.INFO + instr)
 
 	def write_datetime(self, datetime):
-		with open(self.DATABASE_NAME, "a") as db:
-			when = datetime.strftime("%Y-%m-%d %H:%M:%S")
-			print self.WRITE + "Recording date and time"
-			date = when.split(" ")[0]
-			time = when.split(" ")[1]
-			print self.INFO_TAB + "%s" % date
-			print self.INFO_TAB + "%s" % time
-			db.write("%s,%s," % (date, time))
-		self.rest()
+		when = datetime.strftime("%Y-%m-%d %H:%M:%S")
+		print(self.WRITE + "Recording date and time")
+		date = when.split(" ")[0]
+		time = when.split(" ")[1]
+		print(self.INFO_TAB + "%s" % date)
+		print(self.INFO_TAB + "%s" % time)
+		self.record("%s", date)
+		self.record("%s", time)
 
 	def write_xywhere(self, where):
-		with open(self.DATABASE_NAME, "a") as db:
-			where_x = where[1]
-			where_y = where[0]
-			print self.WRITE + "Recording cartesian pixel location"
-			print self.INFO_TAB + "(%d px, %d px)" % (where_x, where_y)
-			db.write("%d,%d," % (where_x, where_y))
-		self.rest()
+		where_x = where[1]
+		where_y = where[0]
+		print(self.WRITE + "Recording cartesian pixel location")
+		print(self.INFO_TAB + "(%d px, %d px)" % (where_x, where_y))
+		self.record("%d", where_x)
+		self.record("%d", where_y)
 
 	def write_hpcwhere(self, where):
-		with open(self.DATABASE_NAME, "a") as db:
-			where_x = where.Tx.value
-			where_y = where.Ty.value
-			print self.WRITE + "Recording helioprojective coordinate location"
-			print self.INFO_TAB + "(%.3f arcsec, %.3f arcsec)" % (where_x, where_y)
-			db.write("%.3f,%.3f," % (where_x, where_y))
-		self.rest()
+		where_x = where.Tx.value
+		where_y = where.Ty.value
+		print(self.WRITE + "Recording helioprojective coordinate location")
+		print(self.INFO_TAB + "(%.3f arcsec, %.3f arcsec)" % (where_x, where_y))
+		self.record("%.3f", where_x)
+		self.record("%.3f", where_y)
 
 	def write_xysize(self, size):
-		with open(self.DATABASE_NAME, "a") as db:
-			print self.WRITE + "Recording pixel size"
-			print self.INFO_TAB + "%d px x %d px" % (size, size)
-			db.write("%d,%d," % (size, size))
-		self.rest()
+		print(self.WRITE + "Recording pixel size")
+		print(self.INFO_TAB + "%d px x %d px" % (size, size))
+		self.record("%d", size)
+		self.record("%d", size)
 
 	def write_hpcsize(self, bl, tr):
-		with open(self.DATABASE_NAME, "a") as db:
-			size_x = tr.Tx.value - bl.Tx.value
-			size_y = tr.Ty.value - bl.Ty.value
-			print self.WRITE + "Recording helioprojective size"
-			print self.INFO_TAB + "%d arcsec x %d arcsec" % (size_x, size_y)
-			db.write("%d,%d," % (size_x, size_y))
-		self.rest()
+		size_x = tr.Tx.value - bl.Tx.value
+		size_y = tr.Ty.value - bl.Ty.value
+		print(self.WRITE + "Recording helioprojective size")
+		print(self.INFO_TAB + "%d arcsec x %d arcsec" % (size_x, size_y))
+		self.record("%d", size_x)
+		self.record("%d", size_y)
 
 	def write_inten(self, low_thresh, avg, med, max):
-		with open(self.DATABASE_NAME, "a") as db:
-			print self.WRITE + "Recording intensity low threshold"
-			print self.INFO_TAB + "%.1f" % low_thresh
-			db.write("%.1f," % low_thresh)
-			print self.WRITE + "Recording average intensity"
-			print self.INFO_TAB + "%.1f" % avg
-			db.write("%.1f," % avg)
-			print self.WRITE + "Recording median intensity"
-			print self.INFO_TAB + "%.0f" % med
-			db.write("%.0f," % med)
-			print self.WRITE + "Recording maximum intensity"
-			print self.INFO_TAB + "%.0f" % max
-			db.write("%.0f," % max)
-		self.rest()
+		print(self.WRITE + "Recording intensity low threshold")
+		print(self.INFO_TAB + "%.1f" % low_thresh)
+		self.record("%.1f", low_thresh)
+		print(self.WRITE + "Recording average intensity")
+		print(self.INFO_TAB + "%.1f" % avg)
+		self.record("%.1f", avg)
+		print(self.WRITE + "Recording median intensity")
+		print(self.INFO_TAB + "%.0f" % med)
+		self.record("%.0f", med)
+		print(self.WRITE + "Recording maximum intensity")
+		print(self.INFO_TAB + "%.0f" % max)
+		self.record("%.0f", max)
 
 	def write_gauss(self, unsig, avg, median):
-		with open(self.DATABASE_NAME, "a") as db:
-			print self.WRITE + "Recording total unsigned gauss"
-			print self.INFO_TAB + "%.1f" % unsig
-			db.write("%.3f," % unsig)
-			print self.WRITE + "Recording average signed gauss"
-			print self.INFO_TAB + "%.3f" % avg
-			db.write("%.3f," % avg)
-			print self.WRITE + "Recording median signed gauss"
-			print self.INFO_TAB + "%.3f" % median
-			db.write("%.3f," % median)
-		self.rest()
+		print(self.WRITE + "Recording total unsigned gauss")
+		print(self.INFO_TAB + "%.1f" % unsig)
+		self.record("%.3f", unsig)
+		print(self.WRITE + "Recording average signed gauss")
+		print(self.INFO_TAB + "%.3f" % avg)
+		self.record("%.3f", avg)
+		print(self.WRITE + "Recording median signed gauss")
+		print(self.INFO_TAB + "%.3f" % median)
+		self.record("%.3f", median)
+
+	def write_track(self, track, keyframe):
+		# keyframe: whether the row's statistics come from the fitted masks (see the header note)
+		print(self.WRITE + "Recording track")
+		print(self.INFO_TAB + "%d%s" % (track, " (keyframe)" if keyframe else ""))
+		self.record("%d", track)
+		self.record("%d", int(keyframe))
 
 	def write_image(self, type, id, data, instr, wav):
-		if type == 0:
-			name = "raw image"
-			dir = "resources/region-data/raw-images"
-		elif type == 1:
-			name = "masked image"
-			dir = "resources/region-data/r-masked-images"
-		elif type == 2:
-			name = "elliptically-masked image"
-			dir = "resources/region-data/e-masked-images"
-		elif type == 3:
-			name = "contour-masked image"
-			dir = "resources/region-data/c-masked-images"
-		
-		print self.WRITE + "Saving '%s' to '%s'" % (name, dir)
-		
-		print self.INFO_TAB + "%05d%s%d.npy" % (id, instr, int(wav.value))
-		np.save("%s/%s/%05d%s%d" % (MAIN_DIR, dir, id, instr, int(wav.value)), data)
-		self.rest()
+		name, product = self.PRODUCTS[type]
+		channel = "%s%d" % (instr, int(wav.value))
+
+		print(self.WRITE + "Saving '%s' to '%s'" % (name, product))
+		if self.DEFERRED:
+			print(self.INFO_TAB + channel)
+			# a copy: callers may hand over a reused buffer (e.g. HMIAligner.window) before the frame is merged
+			self.images.append((product, channel, np.array(data)))
+			return
+		print(self.INFO_TAB + "%05d %s" % (id, channel))
+		self.store(id, product, channel, data)
+
+	##### region records: begin() opens a row, commit() keeps it, abort() drops it without any I/O
+
+	def begin(self):
+		if len(self.row) > 0:
+			self.warn_text("Uncommitted entry discarded")
+		self.row = []
+		self.images = []
+
+	def commit(self):
+		print(self.INFO + "Finished entry; recording new line" + self.NEW_LINE)
+		if self.DEFERRED:
+			self.entries.append((self.row, self.images))
+		elif len(self.row) > 0:
+			self.rows.append(self.row)
+		self.row = []
+		self.images = []
+		if len(self.rows) >= FLUSH_ROWS:
+			self.flush()
+
+	def abort(self):
+		self.row = []
+		self.images = []
+
+	def take(self):
+		# a deferred Recorder's committed entries, handed over and cleared
+		entries, self.entries = self.entries, []
+		return entries
+
+	def merge(self, entries, first_id):
+		# records deferred entries under consecutive IDs from first_id; returns the next free ID
+		for ID, (row, images) in enumerate(entries, first_id):
+			self.rows.append([("%05d", ID)] + row)
+			for product, channel, data in images:
+				self.store(ID, product, channel, data)
+			if len(self.rows) >= FLUSH_ROWS:
+				self.flush()
+		return first_id + len(entries)
 
 	def new_line(self):
-		with open(self.DATABASE_NAME, "rb+") as db:
-			print self.INFO + "Finished entry; recording new line" + self.NEW_LINE
-			db.seek(-1, os.SEEK_END)
-			db.truncate()
-			db.write("\n")
-		self.rest()
+		self.commit()
 
 	def line(self):
-		print self.NEW_LINE
+		print(self.NEW_LINE)
 
 	def off_disk(self):
-		print self.WARN + "Off-disk region identified; skipping"
-		with open(self.DATABASE_NAME, "r") as db:
-			lines = db.readlines()
-		with open(self.DATABASE_NAME, "w") as db:
-			for i in range(len(lines) - 1):
-				db.write(lines[i])
-		self.new_line()
+		print(self.WARN + "Off-disk region identified; skipping")
+		self.abort()
 
 	def too_small(self):
-		print self.WARN + "Region to small; skipping"
-		with open(self.DATABASE_NAME, "r") as db:
-			lines = db.readlines()
-		with open(self.DATABASE_NAME, "w") as db:
-			for i in range(len(lines) - 1):
-				db.write(lines[i])
-		self.new_line()
-
-	def rest(self):
-		time.sleep(0.05)
+		print(self.WARN + "Region to small; skipping")
+		self.abort()
 
 	def input_text(self, text):
 		return raw_input("\n" + self.INPUT + "%s:\n\t==> " % text + Color.YELLOW)
 
 	def display_item(self, desc, item):
-		print "\n" + self.PARAM + "%s\n%s" % (desc, item)
+		print("\n" + self.PARAM + "%s\n%s" % (desc, item))
 
 	def display_start_time(self, name):
 		self.start_time = datetime.now()
-		print "\n" + self.SYS + "Process %s started at %s" % (name, datetime.now().replace(microsecond = 0))
-		print self.NEW_LINE
+		print("\n" + self.SYS + "Process %s started at %s" % (name, datetime.now().replace(microsecond = 0)))
+		print(self.NEW_LINE)
 
 	def display_end_time(self, name):
 		self.delta = datetime.now() - self.start_time
-		print "\n" + self.SYS + "Process %s ended at %s" % (name, datetime.now().replace(microsecond = 0))
-		print self.SYS + "Execution time: %s" % str(self.delta).split(".")[0]
-		print self.NEW_LINE
-		print Color.RESET
-
-	def remove_duplicates(self):
-		print self.WARN + "Removing duplicates"
-		with open(self.DATABASE_NAME, "r") as db:
-			lines = db.readlines()
-
-		for i in range(len(lines)):
-			lines[i] = lines[i].split(",")
-
-		with open(self.DATABASE_NAME, "w") as db:
-			db.write(",".join(lines[0]))
-			for i in range(2, len(lines)):
-				if (np.abs(int(lines[i][3]) - int(lines[i - 1][3])) > 20) and (np.abs(int(lines[i][4]) - int(lines[i - 1][4])) > 20):
-					db.write(",".join(lines[i - 1]))
-			db.write(",".join(lines[len(lines) - 1]))
+		print("\n" + self.SYS + "Process %s ended at %s" % (name, datetime.now().replace(microsecond = 0)))
+		print(self.SYS + "Execution time: %s" % str(self.delta).split(".")[0])
+		print(self.NEW_LINE)
+		print(Color.RESET)
+
+	def remove_duplicates(self, coordinates = "pixel"):
+		# clusters near-coincident detections (pixel, or derotated helioprojective coordinates,
+		# and time) across the whole database and keeps one region per cluster
+		print(self.WARN + "Removing duplicates")
+		self.flush()
+		kept, total, removed = dedupe(self.DATABASE_NAME, coordinates)
+		# the removed regions' images leave the store index; the archive's members are already
+		# written, and RegionData only serves regions the database still lists
+		self.ARTIFACTS.drop(removed)
+		self.ARTIFACTS.flush()
+		print(self.INFO_TAB + "%d of %d rows kept" % (kept, total))
@@ -0,0 +1,79 @@
+# Region access layer: database rows by ID, LRU-cached region images, and batch rendering over a process pool
+
+from artifacts import ArtifactStore
+from collections import OrderedDict
+from multiprocessing import Pool
+import numpy as np
+import os
+
+REGION_DATA = "resources/region-data"
+CACHE_SIZE = 32
+
+def load_database(path):
+	# header names and an ID --> row fields index; a later row with the same ID wins, as the
+	# old line-by-line scan did
+	with open(path) as db:
+		header = db.readline().strip().split(",")
+		rows = OrderedDict()
+		for line in db:
+			fields = line.strip().split(",")
+			if fields[0] != "":
+				rows[int(fields[0])] = fields
+	return header, rows
+
+class RegionData(object):
+
+	def __init__(self, root = REGION_DATA, cache_size = CACHE_SIZE, database = "database.csv"):
+		self.ROOT = root
+		self.CACHE_SIZE = cache_size
+		self.HEADER, self.ROWS = load_database(os.path.join(root, database))
+		self.cache = OrderedDict()
+		self.store = None
+		self.pid = None
+
+	def ids(self):
+		return list(self.ROWS)
+
+	def row(self, id):
+		return self.ROWS[int(id)]
+
+	def artifacts(self):
+		# opened per process, so a pool never shares the parent's SQLite connection
+		path = os.path.join(self.ROOT, "artifacts")
+		if self.pid != os.getpid():
+			self.pid = os.getpid()
+			self.store = ArtifactStore(path) if os.path.isfile(os.path.join(path, "index.db")) else None
+		return self.store
+
+	def image(self, product, id, channel = ""):
+		# from the artifact store when the run wrote one, else the per-file .npy layout; regions
+		# removed from the database (e.g. as duplicates) raise KeyError even if their images remain
+		if int(id) not in self.ROWS:
+			raise KeyError(id)
+		key = (int(id), product, channel)
+		if key in self.cache:
+			data = self.cache.pop(key)
+		else:
+			store = self.artifacts()
+			if store is not None and key in store:
+				data = store.get(*key)
+			else:
+				data = np.load(os.path.join(self.ROOT, product, "%05d%s.npy" % (int(id), channel)))
+		self.cache[key] = data
+
+		while len(self.cache) > self.CACHE_SIZE:
+			self.cache.popitem(last = False)
+		return data
+
+def render_regions(render, ids, processes = None):
+	# render(id) for every id, in a process pool unless processes == 1
+	ids = list(ids)
+	if processes == 1 or len(ids) <= 1:
+		return [render(id) for id in ids]
+
+	pool = Pool(processes)
+	try:
+		return pool.map(render, ids, chunksize = 4)
+	finally:
+		pool.close()
+		pool.join()
@@ -0,0 +1,47 @@
+# Catalog.scan skips files it cannot date instead of aborting the build
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Catalog
+
+HEADERS = {
+	"good.fits" : {"INSTRUME" : "AIA_3", "WAVELNTH" : 304, "DATE-OBS" : "2018-01-01T00:00:05.34Z"},
+	"empty.fits" : {"INSTRUME" : "AIA_3", "WAVELNTH" : 304, "DATE-OBS" : ""},
+	"missing.fits" : {"INSTRUME" : "HMI_SIDE1", "WAVELNTH" : 6173},
+	"truncated.fits" : None
+}
+
+def reader(path):
+	header = HEADERS[os.path.basename(path)]
+	if header is None:
+		raise IOError("truncated file")
+	return header
+
+class ScanTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		for name in HEADERS:
+			open(os.path.join(self.dir, name), "w").close()
+		self.catalog = Catalog(os.path.join(self.dir, "catalog.db"))
+
+	def tearDown(self):
+		self.catalog.close()
+		shutil.rmtree(self.dir)
+
+	def test_bad_files_are_skipped(self):
+		with warnings.catch_warnings(record = True) as caught:
+			warnings.simplefilter("always")
+			self.assertEqual(self.catalog.scan([self.dir], reader = reader, threads = 2), 1)
+		self.assertEqual(len(caught), 3)
+		self.assertEqual([os.path.basename(path) for path in self.catalog.files("AIA304")], ["good.fits"])
+
+if __name__ == "__main__":
+	unittest.main()
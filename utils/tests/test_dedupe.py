@@ -0,0 +1,65 @@
+# Duplicate suppression keeps tracked per-frame rows and merges only within the seed's window
+
+from datetime import datetime, timedelta
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedupe import dedupe
+from recorder import COLUMNS, TRACK_COLUMNS
+
+START = datetime(2018, 1, 1)
+
+def row(id, seconds, x, y, track = None):
+	when = START + timedelta(seconds = seconds)
+	fields = ["%05d" % id, when.strftime("%Y-%m-%d"), when.strftime("%H:%M:%S"), "%d" % x, "%d" % y]
+	fields += ["0.000"] * (len(COLUMNS) - len(fields))
+	if track is not None:
+		fields += ["%d" % track, "1"]
+	return ",".join(fields) + "\n"
+
+class DedupeTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "database.csv")
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def write(self, columns, rows):
+		with open(self.path, "w") as db:
+			db.write(",".join(columns) + "\n")
+			db.write("".join(rows))
+
+	def kept_ids(self):
+		with open(self.path) as db:
+			return [int(line.split(",")[0]) for line in db.readlines()[1:]]
+
+	def test_tracked_rows_survive(self):
+		# one region every 12 s for 10 minutes, slowly drifting: every frame is its own row
+		self.write(COLUMNS + TRACK_COLUMNS, [row(n + 1, 12 * n, 500 + n, 500, track = 1) for n in range(50)])
+		self.assertEqual(dedupe(self.path), (50, 50, []))
+
+	def test_untracked_rows_do_not_chain(self):
+		# without tracks, a 12 s sequence collapses to one region per 120 s window, not to one row
+		self.write(COLUMNS, [row(n + 1, 12 * n, 500, 500) for n in range(50)])
+		kept, total, removed = dedupe(self.path)
+		self.assertEqual(self.kept_ids(), [1, 12, 23, 34, 45])
+		self.assertEqual((kept, total), (5, 50))
+		self.assertEqual(len(removed), 45)
+
+	def test_same_frame_duplicates_merge(self):
+		# a second detection of region 1 in its frame is removed; region 1's next frame is kept
+		self.write(COLUMNS + TRACK_COLUMNS, [row(1, 0, 500, 500, track = 1),
+											 row(2, 0, 505, 500, track = 2),
+											 row(3, 12, 502, 500, track = 1)])
+		self.assertEqual(dedupe(self.path), (2, 3, [2]))
+		self.assertEqual(self.kept_ids(), [1, 3])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,120 @@
+# fetch() against a local HTTP stand-in with Range support and connections dropped on purpose
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader import fetch
+try:
+	from urllib.error import URLError
+except ImportError:
+	from urllib2 import URLError
+
+try:
+	from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+	from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+DATA = os.urandom(200000)
+
+class Handler(BaseHTTPRequestHandler):
+	# serves DATA; server.faults is a list of what to do to the next requests:
+	# "reset" closes before any response, "drop" sends the headers and half the body
+	def do_GET(self):
+		self.server.ranges.append(self.headers.get("Range"))
+		fault = self.server.faults.pop(0) if self.server.faults else None
+		if fault == "reset":
+			self.close_connection = True
+			return
+
+		start = 0
+		if self.headers.get("Range"):
+			start = int(self.headers.get("Range").split("=")[1].split("-")[0])
+			if start >= len(DATA):
+				self.send_response(416)
+				self.send_header("Content-Range", "bytes */%d" % len(DATA))
+				self.send_header("Content-Length", "0")
+				self.end_headers()
+				return
+			self.send_response(206)
+			self.send_header("Content-Range", "bytes %d-%d/%d" % (start, len(DATA) - 1, len(DATA)))
+		else:
+			self.send_response(200)
+		body = DATA[start:]
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+
+		if fault == "drop":
+			self.wfile.write(body[: len(body) // 2])
+			self.wfile.flush()
+			self.close_connection = True
+			return
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+class FetchTest(unittest.TestCase):
+
+	def setUp(self):
+		self.server = HTTPServer(("127.0.0.1", 0), Handler)
+		self.server.faults = []
+		self.server.ranges = []
+		self.thread = threading.Thread(target = self.server.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+		self.url = "http://127.0.0.1:%d/frame.fits" % self.server.server_address[1]
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "frame.fits")
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		shutil.rmtree(self.dir)
+
+	def read(self):
+		with open(self.path, "rb") as f:
+			return f.read()
+
+	def test_plain_download(self):
+		self.assertEqual(fetch(self.url, self.path, backoff = 0), len(DATA))
+		self.assertEqual(self.read(), DATA)
+
+	def test_resumes_after_dropped_body(self):
+		self.server.faults = ["drop"]
+		self.assertEqual(fetch(self.url, self.path, backoff = 0), len(DATA))
+		self.assertEqual(self.read(), DATA)
+		self.assertEqual(self.server.ranges, [None, "bytes=%d-" % (len(DATA) // 2)])
+
+	def test_retries_after_reset_before_response(self):
+		self.server.faults = ["reset", "reset"]
+		self.assertEqual(fetch(self.url, self.path, retries = 3, backoff = 0), len(DATA))
+		self.assertEqual(self.read(), DATA)
+		self.assertEqual(len(self.server.ranges), 3)
+
+	def test_complete_partial_is_kept_on_416(self):
+		with open(self.path + ".part", "wb") as f:
+			f.write(DATA)
+		self.assertEqual(fetch(self.url, self.path, backoff = 0), len(DATA))
+		self.assertEqual(self.read(), DATA)
+		self.assertFalse(os.path.exists(self.path + ".part"))
+
+	def test_refused_connection_is_retried_with_backoff(self):
+		probe = socket.socket()
+		probe.bind(("127.0.0.1", 0))
+		url = "http://127.0.0.1:%d/frame.fits" % probe.getsockname()[1]
+		probe.close()
+
+		start = time.time()
+		self.assertRaises(URLError, fetch, url, self.path, 3, 5, 0.1)
+		self.assertGreaterEqual(time.time() - start, 0.3) # 0.1 s, then 0.2 s between the three attempts
+
+if __name__ == "__main__":
+	unittest.main()
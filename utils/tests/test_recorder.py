@@ -0,0 +1,43 @@
+# Deferred Recorder entries must own their images: frame workers hand over reused buffers
+
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hmialign import align_window, HMIAligner
+from recorder import Recorder
+import astropy.units as u
+import numpy as np
+
+class Frame(object):
+
+	def __init__(self, data, scale):
+		self.data = data
+		self.scale = [scale * u.arcsec / u.pixel]
+
+class DeferredImageTest(unittest.TestCase):
+
+	def test_same_size_windows_keep_their_data(self):
+		hmi = Frame(np.random.RandomState(0).normal(size = (256, 256)), 1.0)
+		aia = Frame(np.zeros((512, 512)), 0.5)
+		aligner = HMIAligner()
+		frame = Recorder(deferred = True)
+		windows = [((100, 140), (100, 140)), ((300, 340), (260, 300))]
+
+		for rows, cols in windows:
+			frame.begin()
+			frame.write_image(0, None, aligner.window(hmi, aia, (256, 256), rows, cols), "HMI", 6173 * u.AA)
+			frame.commit()
+
+		entries = pickle.loads(pickle.dumps(frame.take()))
+		first, second = [images[0][2] for row, images in entries]
+		self.assertFalse(np.shares_memory(first, second))
+		for (rows, cols), stored in zip(windows, (first, second)):
+			np.testing.assert_array_equal(stored, align_window(hmi.data, 2.0, (256, 256), rows, cols))
+		self.assertFalse(np.array_equal(first, second))
+
+if __name__ == "__main__":
+	unittest.main()
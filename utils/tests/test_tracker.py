@@ -0,0 +1,36 @@
+# Tracker frames count every update, detections or not
+
+from datetime import datetime, timedelta
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracker import Tracker
+import numpy as np
+
+START = datetime(2018, 1, 1)
+
+def update(tracker, minute, x = ()):
+	x = np.array(x, dtype = float)
+	return tracker.update(START + timedelta(minutes = minute), x, np.zeros(len(x)), [100] * len(x), [500.] * len(x))
+
+class EmptyFrameTest(unittest.TestCase):
+
+	def test_empty_frames_end_a_track(self):
+		tracker = Tracker(max_gap = 2)
+		self.assertEqual(update(tracker, 0, [100]), ([1], [True]))
+		for minute in (1, 2, 3):
+			self.assertEqual(update(tracker, minute), ([], []))
+		self.assertEqual(update(tracker, 4, [100]), ([2], [True]))
+
+	def test_empty_frames_count_towards_keyframes(self):
+		tracker = Tracker(keyframes = 3)
+		update(tracker, 0, [100])
+		update(tracker, 1)
+		self.assertEqual(update(tracker, 2, [100]), ([1], [False]))
+		self.assertEqual(update(tracker, 3, [100]), ([1], [True]))
+
+if __name__ == "__main__":
+	unittest.main()
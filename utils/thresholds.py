@@ -0,0 +1,41 @@
+# Threshold matching: the integer threshold leaving a target pixel count, from one sort instead of unit steps
+
+import numpy as np
+
+def settle(T, target, count, start):
+	# same answer as "while count(T) > target: T += 1", then stepping back one if that lands closer to target
+	if T <= start:
+		return start
+	if abs(target - count(T)) > abs(target - count(T - 1)):
+		return T - 1
+	return T
+
+def match_threshold(data, target, start = 0):
+	# integer T >= start with #(data > T) nearest target; NaNs never count, as with data > T
+	values = np.asarray(data).ravel()
+	if np.issubdtype(values.dtype, np.floating):
+		values = values[~np.isnan(values)]
+	if target >= len(values):
+		return start
+
+	# #(values > T) <= target exactly when T >= the (target + 1)-th largest value
+	k = len(values) - int(target) - 1
+	T = max(start, int(np.ceil(np.partition(values, k)[k])))
+	return settle(T, target, lambda t: np.count_nonzero(values > t), start)
+
+def match_thresholds(stack, targets, start = 0):
+	# the same for a batch of equally sized cutouts (e.g. every channel of one region): one sort
+	# per cutout; targets is one count or one per cutout
+	values = np.sort(np.asarray(stack, dtype = float).reshape(len(stack), -1), axis = 1) # NaNs sort last
+	valid = np.count_nonzero(~np.isnan(values), axis = 1)
+	targets = np.broadcast_to(np.asarray(targets, dtype = int), (len(stack),))
+
+	thresholds = []
+	for row, n, target in zip(values, valid, targets):
+		if target >= n:
+			thresholds.append(start)
+			continue
+		T = max(start, int(np.ceil(row[n - target - 1])))
+		ascending = row[:n]
+		thresholds.append(settle(T, target, lambda t: n - np.searchsorted(ascending, t, side = "right"), start))
+	return thresholds
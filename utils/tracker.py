@@ -0,0 +1,114 @@
+# Region tracking: detections linked across frames by differential-rotation prediction, and the
+# keyframes at which a tracked region gets its full mask analysis
+
+from dedupe import EPOCH, heliographic, RSUN, rotation_rate
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+import numpy as np
+
+MATCH_TOLERANCE = 30.0 # arcsec between a predicted and a detected position
+KEYFRAME_INTERVAL = 10 # frames between full analyses of a tracked region; 1 analyzes every frame
+CHANGE_TOLERANCE = 0.2 # relative change of box size or mean brightness that forces a full analysis
+MAX_GAP = 3 # frames a track may go undetected before it is dropped
+
+def seconds(when):
+	# datetime or astropy Time --> seconds since EPOCH
+	if hasattr(when, "unix"):
+		return float(when.unix)
+	return (when - EPOCH).total_seconds()
+
+def rotate(hpc_x, hpc_y, dt):
+	# helioprojective position dt seconds later under differential rotation; latitude is kept
+	lon, lat = heliographic(hpc_x, hpc_y)
+	lon = np.clip(lon + np.radians(rotation_rate(lat) * dt / 86400.), -np.pi / 2, np.pi / 2)
+	return RSUN * np.cos(lat) * np.sin(lon), hpc_y
+
+def hungarian(cost, tolerance):
+	# minimum total distance assignment; gated pairs get a cost no admissible pair can reach
+	gated = np.where(cost <= tolerance, cost, tolerance * (1 + cost.size))
+	rows, cols = linear_sum_assignment(gated)
+	keep = cost[rows, cols] <= tolerance
+	return list(zip(rows[keep], cols[keep]))
+
+def greedy(cost, tolerance):
+	# closest pairs first, each track and detection used once
+	pairs = []
+	used_rows, used_cols = set(), set()
+	for n in np.argsort(cost, axis = None):
+		row, col = np.unravel_index(n, cost.shape)
+		if cost[row, col] > tolerance:
+			break
+		if row not in used_rows and col not in used_cols:
+			pairs.append((row, col))
+			used_rows.add(row)
+			used_cols.add(col)
+	return pairs
+
+MATCHING = {
+	"hungarian" : hungarian,
+	"greedy" : greedy
+}
+
+def changed(new, old, tolerance):
+	if not old or not np.isfinite(old) or not np.isfinite(new):
+		return True
+	return abs(new / float(old) - 1) > tolerance
+
+class Tracker(object):
+
+	def __init__(self, tolerance = MATCH_TOLERANCE, keyframes = KEYFRAME_INTERVAL, change = CHANGE_TOLERANCE,
+				 max_gap = MAX_GAP, matching = "hungarian"):
+		self.TOLERANCE = tolerance
+		self.KEYFRAMES = keyframes
+		self.CHANGE = change
+		self.MAX_GAP = max_gap
+		self.MATCH = MATCHING[matching]
+
+		# track ID --> last position, time and frame, and the size and brightness at its last keyframe
+		self.tracks = {}
+		self.next_id = 1
+		self.frame = -1
+
+	def predict(self, time):
+		ids = sorted(self.tracks)
+		if len(ids) == 0:
+			return ids, np.zeros((0, 2))
+		x = np.array([self.tracks[id]["x"] for id in ids])
+		y = np.array([self.tracks[id]["y"] for id in ids])
+		dt = np.array([time - self.tracks[id]["time"] for id in ids])
+		return ids, np.column_stack(rotate(x, y, dt))
+
+	def update(self, when, hpc_x, hpc_y, sizes, means):
+		# links one frame's detections to the tracks; returns (track IDs, keyframe flags), one per detection
+		self.frame += 1
+		time = seconds(when)
+		detections = np.column_stack((hpc_x, hpc_y)).reshape(-1, 2)
+		ids, predicted = self.predict(time)
+
+		matches = {}
+		if len(ids) > 0 and len(detections) > 0:
+			for row, col in self.MATCH(cdist(predicted, detections), self.TOLERANCE):
+				matches[col] = ids[row]
+
+		tracks, keyframes = [], []
+		for n in range(len(detections)):
+			id = matches.get(n)
+			if id is None:
+				id = self.next_id
+				self.next_id += 1
+				self.tracks[id] = {"key_frame" : None, "key_size" : None, "key_mean" : None}
+			track = self.tracks[id]
+			track.update(x = detections[n, 0], y = detections[n, 1], time = time, frame = self.frame)
+
+			keyframe = bool(self.KEYFRAMES <= 1 or track["key_frame"] is None
+							or self.frame - track["key_frame"] >= self.KEYFRAMES
+							or changed(sizes[n], track["key_size"], self.CHANGE)
+							or changed(means[n], track["key_mean"], self.CHANGE))
+			if keyframe:
+				track.update(key_frame = self.frame, key_size = sizes[n], key_mean = means[n])
+			tracks.append(id)
+			keyframes.append(keyframe)
+
+		for id in [id for id in self.tracks if self.frame - self.tracks[id]["frame"] > self.MAX_GAP]:
+			del self.tracks[id]
+		return tracks, keyframes
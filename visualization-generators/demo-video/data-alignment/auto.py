@@ -0,0 +1,28 @@
+from align import align_catalog
+from catalog import Catalog
+from datetime import datetime
+from IPython.core import debugger ; debug = debugger.Pdb().set_trace
+
+PATH = "/Volumes/Nicholas Data/"
+PATH171 = "/Volumes/Nicholas Data/AIA171/"
+PATH304 = "/Volumes/Nicholas Data/AIA304/"
+PATHHMI = "/Volumes/Nicholas Data/HMI/"
+
+def stamp(t):
+	return datetime.utcfromtimestamp(t).strftime("%Y-%m-%dT%H:%M:%S")
+
+CATALOG = Catalog()
+print "%d new files indexed" % CATALOG.scan([PATH171, PATH304, PATHHMI])
+
+ALIGNMENT = align_catalog(CATALOG, ["AIA171", "AIA304", "HMI"])
+
+for line in ALIGNMENT.report():
+	print line
+
+for name in ALIGNMENT.NAMES:
+	for start, end in ALIGNMENT.gaps(name):
+		print "%s gap from %s to %s" % (name, stamp(start), stamp(end))
+	for t in ALIGNMENT.duplicates(name):
+		print "%s duplicate at %s" % (name, stamp(t))
+	for t in ALIGNMENT.dropped(name):
+		print "%s missing for AIA171 frame at %s" % (name, stamp(t))
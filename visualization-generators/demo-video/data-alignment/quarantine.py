@@ -0,0 +1,44 @@
+from catalog import Catalog
+from IPython.core import debugger ; debug = debugger.Pdb().set_trace
+from os.path import abspath, basename, join
+from quality import quality_pass
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument("dirs", nargs = "*", default = ["/Users/padman/Desktop/AIA335"])
+parser.add_argument("--channels", nargs = "+", default = None) # catalog channels to check, e.g. AIA304; default every channel in dirs
+parser.add_argument("--quality-mask", dest = "quality_mask", type = lambda value: int(value, 0), default = None) # QUALITY bits that flag a frame
+parser.add_argument("--headers-only", dest = "headers_only", action = "store_true")
+parser.add_argument("--release", action = "store_true")
+parser.add_argument("--list", action = "store_true")
+args = parser.parse_args()
+
+# frames known to be bad by inspection, matched against file names
+bad_dates = ["015402", "015602", "020202", "020802", "043802", "194502", "194602", "194702", "194802", "194902", "195002", "200002"]
+
+CATALOG = Catalog()
+print "%d new files indexed" % CATALOG.scan(args.dirs)
+
+if args.release:
+	CATALOG.release()
+	print "Quarantine cleared"
+
+DIRS = tuple(join(abspath(dir), "") for dir in args.dirs)
+CHANNELS = args.channels or CATALOG.channels()
+
+manual = {}
+for channel in CHANNELS:
+	for path in CATALOG.files(channel):
+		if not path.startswith(DIRS):
+			continue
+		for date in bad_dates:
+			if date in basename(path):
+				manual[path] = "manual %s" % date
+CATALOG.quarantine(manual)
+
+flags = quality_pass(CATALOG, CHANNELS, args.dirs, check_data = not args.headers_only, quality_mask = args.quality_mask)
+print "%d frames flagged by date, %d by quality checks" % (len(manual), len(flags))
+
+if args.list:
+	for row in CATALOG.quarantined():
+		print "%s\t%s\t%s" % (row["channel"], basename(row["path"]), row["reason"])
@@ -1,15 +1,15 @@
 import warnings
 warnings.filterwarnings("ignore", message = "numpy.dtype size changed")
 
+from align import align_catalog
 from astropy.coordinates import SkyCoord
+from catalog import Catalog
+from contours import contour_mask, fill_polygon, largest_contours
 from copy import copy
 from datetime import datetime
+from hmialign import HMIAligner, hmi_scale
 from IPython.core import debugger; debug = debugger.Pdb().set_trace
-from matplotlib.path import Path
-from os import listdir
-from os.path import isfile, join
 from recorder import Recorder
-from scipy.ndimage import zoom as interpolate
 from scipy.ndimage.measurements import center_of_mass as com
 from scipy.spatial import distance
 from skimage import measure
@@ -35,30 +35,31 @@ PATH171 = "/Volumes/Nicholas-Data/AIA171/"
 PATH304 = "/Volumes/Nicholas-Data/AIA304/"
 PATHHMI = "/Volumes/Nicholas-Data/HMI/"
 
-AIA171_DIR = [f for f in listdir(PATH171) if isfile(join(PATH171, f))]
-AIA304_DIR = [f for f in listdir(PATH304) if isfile(join(PATH304, f))]
-HMI_DIR = [f for f in listdir(PATHHMI) if isfile(join(PATHHMI, f))]
+CATALOG = Catalog()
+RECORDER.info_text("%d new files indexed" % CATALOG.scan([PATH171, PATH304, PATHHMI]))
+ALIGNMENT = align_catalog(CATALOG, ["AIA171", "AIA304", "HMI"])
+for line in ALIGNMENT.report():
+	RECORDER.info_text(line)
+FRAMES = ALIGNMENT.tuples()
 
-def hmialign(data, scale):
-	ALIGNED_RAW_HMI = np.zeros((4096, 4096)).astype(float)
-	ALIGNED_RAW_HMI[ALIGNED_RAW_HMI == 0] = -10000000
+def load_maps(id):
+	return tuple(smap.Map(path) for path in FRAMES[id])
 
-	RECORDER.info_text("Interpolating HMI data with %.6f scale factor..." % scale)
-	interpolated_hmi_data = interpolate(data, scale, order = 1)
-	interpolated_hmi_data = np.flip(interpolated_hmi_data, (0,1))
+HMI_ALIGNER = HMIAligner(fill = -10000000)
 
-	x_size = interpolated_hmi_data.shape[1]
-	y_size = interpolated_hmi_data.shape[0]
-	x_center = 4096 - int(AIA304.reference_pixel.y.value + 0.5)
-	y_center = 4096 - int(AIA304.reference_pixel.x.value + 0.5)
+def hmi_center():
+	return (4096 - int(AIA304.reference_pixel.x.value + 0.5), 4096 - int(AIA304.reference_pixel.y.value + 0.5))
 
-	RECORDER.info_text("Casting interpolated HMI data to 4k by 4k empty image...")
-	ALIGNED_RAW_HMI[(y_center - 1 - y_size / 2) : (y_center + y_size / 2),
-					(x_center - 1 - x_size / 2) : (x_center + x_size / 2)] = interpolated_hmi_data
+def hmialign():
+	RECORDER.info_text("Aligning HMI data with %.3f scale factor..." % hmi_scale(HMI, AIA304))
+	aligned = HMI_ALIGNER.aligned(HMI, AIA304, hmi_center())
+	aligned[np.isnan(aligned)] = -10000000
+	return aligned
 
-	ALIGNED_RAW_HMI[np.isnan(ALIGNED_RAW_HMI)] = -10000000
-
-	return ALIGNED_RAW_HMI
+def hmiwindow(rows, cols):
+	window = HMI_ALIGNER.window(HMI, AIA304, hmi_center(), rows, cols)
+	window[np.isnan(window)] = -10000000
+	return window
 
 #################################################
 #################################################
@@ -71,9 +72,7 @@ ID = 0
 PREFLARE_COUNT = 1920
 
 # for i in tqdm(range(PREFLARE_COUNT), desc = "Working..."):
-# 	AIA171 = smap.Map(PATH171 + AIA171_DIR[i])
-# 	AIA304 = smap.Map(PATH304 + AIA304_DIR[i])
-# 	HMI = smap.Map(PATHHMI + HMI_DIR[i])
+# 	AIA171, AIA304, HMI = load_maps(i)
 
 # 	RECORDER.info_text("Current timestamp: %s" % AIA171.date)
 
@@ -92,9 +91,7 @@ PREFLARE_COUNT = 1920
 # 	# plt.imsave(IMAGE_SAVEPATH + "aia304-images/%05d" % ID, img, cmap = "sdoaia304", origin = "lower", vmin = 0, vmax = 3)
 
 # 	RECORDER.info_text("Aligning HMI full-disk image #%05d" % ID)
-# 	scale = (HMI.scale[0] / AIA304.scale[0]).value
-# 	scale = float("%.3f" % scale)
-# 	ALIGNED_RAW_HMI = hmialign(HMI.data, scale)
+# 	ALIGNED_RAW_HMI = hmialign()
 
 # 	RECORDER.sys_text("Writing full-disk HMI image #%05d..." % ID)
 # 	# plt.imsave(IMAGE_SAVEPATH + "hmi-images/%05d" % ID, ALIGNED_RAW_HMI, cmap = "gray", origin = "lower", vmin = -120, vmax = 120)
@@ -113,9 +110,7 @@ p = copy(ID)
 
 RECORDER.info_text("Preparing for zoom animation...")
 
-AIA171 = smap.Map(PATH171 + AIA171_DIR[ID])
-AIA304 = smap.Map(PATH304 + AIA304_DIR[ID])
-HMI = smap.Map(PATHHMI + HMI_DIR[ID])
+AIA171, AIA304, HMI = load_maps(ID)
 
 aia171_img = AIA171.data
 aia171_img[aia171_img < 1] = 1
@@ -126,9 +121,7 @@ aia304_img_o = AIA304.data
 aia304_img[aia304_img < 1] = 1
 aia304_img = np.log(aia304_img)/AIA304.exposure_time.value
 
-scale = (HMI.scale[0] / AIA304.scale[0]).value
-scale = float("%.3f" % scale)
-hmi_img = hmialign(HMI.data, scale)
+hmi_img = hmialign()
 
 RECORDER.info_text("Generating zoom animation...")
 
@@ -329,35 +322,8 @@ p = copy(NEW_ID)
 
 RECORDER.info_text("Generating AIA304 contour mask animation...")
 
-contours = np.array(measure.find_contours(r_mask, 0.5))
-
-L = len(contours)
-max_area = 0.0
-max_index = 0
-
-for i in tqdm(range(L), desc = "Working..."):
-	n = len(contours[i])
-	area = 0.0
-	for j in range(n):
-		k = (j + 1) % n
-		area += contours[i][j][0] * contours[i][k][1]
-		area -= contours[i][k][0] * contours[i][j][1]
-	area = abs(area) / 2.0
-	if area > max_area:
-		max_area = area
-		max_index = i
-
-contour = np.array([contours[max_index]])
-
-x_dim = img304.shape[0]
-y_dim = img304.shape[1]
-
-x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-x, y = x.flatten(), y.flatten()
-
-points = np.vstack((x,y)).T
-
-vertices = contour[0]
+contours = measure.find_contours(r_mask, 0.5)
+vertices = contours[largest_contours(contours)[0]]
 L = len(vertices)
 
 temp = copy(img304).astype(float)
@@ -378,9 +344,7 @@ for i in tqdm(range(L), desc = "Working..."):
 	# plt.imsave(IMAGE_SAVEPATH + "hmi-images/%05d" % NEW_ID, imghmi, cmap = "gray", origin = "lower", vmin = -120, vmax = 120)
 	NEW_ID += 1
 
-path = Path(vertices)
-c_mask = path.contains_points(points)
-c_mask = np.rot90(np.flip(c_mask.reshape((y_dim,x_dim)), 1))
+c_mask = fill_polygon(vertices, img304.shape)
 
 c_mask = c_mask.astype(np.uint8)
 c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
@@ -540,86 +504,8 @@ p = copy(NEW_ID)
 
 RECORDER.info_text("Generating HMI contour mask animation...")
 
-contours = np.array(measure.find_contours(r_mask, 0.5))
-
-L = len(contours)
-max_area = 0.0
-max_index = 0
-
-for i in range(L):
-	n = len(contours[i])
-	area = 0.0
-	for j in range(n):
-		k = (j + 1) % n
-		area += contours[i][j][0] * contours[i][k][1]
-		area -= contours[i][k][0] * contours[i][j][1]
-	area = abs(area) / 2.0
-	if area > max_area:
-		max_area = area
-		max_index = i
-
-second_max_area = 0.0
-second_max_index = 0
-
-for i in range(L):
-	n = len(contours[i])
-	area = 0.0
-	for j in range(n):
-		k = (j + 1) % n
-		area += contours[i][j][0] * contours[i][k][1]
-		area -= contours[i][k][0] * contours[i][j][1]
-	area = abs(area) / 2.0
-	if area > second_max_area and area < max_area:
-		second_max_area = area
-		second_max_index = i
-
-third_max_area = 0.0
-third_max_index = 0
-
-for i in range(L):
-	n = len(contours[i])
-	area = 0.0
-	for j in range(n):
-		k = (j + 1) % n
-		area += contours[i][j][0] * contours[i][k][1]
-		area -= contours[i][k][0] * contours[i][j][1]
-	area = abs(area) / 2.0
-	if area > third_max_area and area < second_max_area:
-		third_max_area = area
-		third_max_index = i
-
-fourth_max_area = 0.0
-fourth_max_index = 0
-
-for i in range(L):
-	n = len(contours[i])
-	area = 0.0
-	for j in range(n):
-		k = (j + 1) % n
-		area += contours[i][j][0] * contours[i][k][1]
-		area -= contours[i][k][0] * contours[i][j][1]
-	area = abs(area) / 2.0
-	if area > fourth_max_area and area < third_max_area:
-		fourth_max_area = area
-		fourth_max_index = i
-
-contour1 = np.array([contours[max_index]])
-contour2 = np.array([contours[second_max_index]])
-contour3 = np.array([contours[third_max_index]])
-contour4 = np.array([contours[fourth_max_index]])
-
-x_dim = imghmi.shape[0]
-y_dim = imghmi.shape[1]
-
-x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-x, y = x.flatten(), y.flatten()
-
-points = np.vstack((x,y)).T
-
-vertices1 = contour1[0]
-vertices2 = contour2[0]
-vertices3 = contour3[0]
-vertices4 = contour4[0]
+contours = measure.find_contours(r_mask, 0.5)
+vertices1, vertices2, vertices3, vertices4 = [contours[index] for index in largest_contours(contours, 4)]
 
 L = len(vertices1)
 
@@ -691,22 +577,10 @@ for i in tqdm(range(L), desc = "Working..."):
 	# plt.imsave(IMAGE_SAVEPATH + "hmi-images/%05d" % NEW_ID, temp, cmap = "gray", origin = "lower", vmin = -120, vmax = 120)
 	NEW_ID += 1
 
-path1 = Path(vertices1)
-path2 = Path(vertices2)
-path3 = Path(vertices3)
-path4 = Path(vertices4)
-
-c_mask1 = path1.contains_points(points)
-c_mask1 = np.rot90(np.flip(c_mask1.reshape((y_dim,x_dim)), 1))
-
-c_mask2 = path2.contains_points(points)
-c_mask2 = np.rot90(np.flip(c_mask2.reshape((y_dim,x_dim)), 1))
-
-c_mask3 = path3.contains_points(points)
-c_mask3 = np.rot90(np.flip(c_mask3.reshape((y_dim,x_dim)), 1))
-
-c_mask4 = path4.contains_points(points)
-c_mask4 = np.rot90(np.flip(c_mask4.reshape((y_dim,x_dim)), 1))
+c_mask1 = fill_polygon(vertices1, imghmi.shape)
+c_mask2 = fill_polygon(vertices2, imghmi.shape)
+c_mask3 = fill_polygon(vertices3, imghmi.shape)
+c_mask4 = fill_polygon(vertices4, imghmi.shape)
 
 #################################################
 #################################################
@@ -773,9 +647,7 @@ cx = None
 cy = None
 
 for i in tqdm(range(ID, 2040), desc = "Working..."):
-	AIA171 = smap.Map(PATH171 + AIA171_DIR[i])
-	AIA304 = smap.Map(PATH304 + AIA304_DIR[i])
-	HMI = smap.Map(PATHHMI + HMI_DIR[i])
+	AIA171, AIA304, HMI = load_maps(i)
 
 	x_center = 1652
 	y_center = 2381
@@ -789,15 +661,11 @@ for i in tqdm(range(ID, 2040), desc = "Working..."):
 	cx = int(new_xy[1].value)
 	cy = int(new_xy[0].value)
 
-	scale = (HMI.scale[0] / AIA304.scale[0]).value
-	scale = float("%.3f" % scale)
-	ALIGNED_RAW_HMI = hmialign(HMI.data, scale)
-
 	dim = 200
 
 	img171 = AIA171.data[cx-dim : cx+dim, cy-dim : cy+dim]
 	img304 = AIA304.data[cx-dim : cx+dim, cy-dim : cy+dim]
-	imghmi = ALIGNED_RAW_HMI[cx-dim : cx+dim, cy-dim : cy+dim]
+	imghmi = hmiwindow((cx-dim, cx+dim), (cy-dim, cy+dim))
 
 	img171[img171 < 1] = 1
 	img171 = np.sqrt(img171)/AIA171.exposure_time.value
@@ -812,38 +680,7 @@ for i in tqdm(range(ID, 2040), desc = "Working..."):
 
 	img304 = img304 * r_mask
 
-	contours = np.array(measure.find_contours(r_mask, 0.5))
-
-	L = len(contours)
-	max_area = 0.0
-	max_index = 0
-
-	for i in range(L):
-		n = len(contours[i])
-		area = 0.0
-		for j in range(n):
-			k = (j + 1) % n
-			area += contours[i][j][0] * contours[i][k][1]
-			area -= contours[i][k][0] * contours[i][j][1]
-		area = abs(area) / 2.0
-		if area > max_area:
-			max_area = area
-			max_index = i
-
-	contour = np.array([contours[max_index]])
-
-	x_dim = r_mask.shape[0]
-	y_dim = r_mask.shape[1]
-
-	x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-	x, y = x.flatten(), y.flatten()
-
-	points = np.vstack((x,y)).T
-
-	vertices = contour[0]
-	path = Path(vertices)
-	c_mask = path.contains_points(points)
-	c_mask = np.rot90(np.flip(c_mask.reshape((y_dim,x_dim)), 1))
+	c_mask = contour_mask(r_mask)
 
 	c_mask = c_mask.astype(np.uint8)
 	c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
@@ -866,108 +703,7 @@ for i in tqdm(range(ID, 2040), desc = "Working..."):
 
 	imghmi = imghmi * r_mask
 
-	contours = np.array(measure.find_contours(r_mask, 0.5))
-
-	L = len(contours)
-	max_area = 0.0
-	max_index = 0
-
-	for i in range(L):
-		n = len(contours[i])
-		area = 0.0
-		for j in range(n):
-			k = (j + 1) % n
-			area += contours[i][j][0] * contours[i][k][1]
-			area -= contours[i][k][0] * contours[i][j][1]
-		area = abs(area) / 2.0
-		if area > max_area:
-			max_area = area
-			max_index = i
-
-	second_max_area = 0.0
-	second_max_index = 0
-
-	for i in range(L):
-		n = len(contours[i])
-		area = 0.0
-		for j in range(n):
-			k = (j + 1) % n
-			area += contours[i][j][0] * contours[i][k][1]
-			area -= contours[i][k][0] * contours[i][j][1]
-		area = abs(area) / 2.0
-		if area > second_max_area and area < max_area:
-			second_max_area = area
-			second_max_index = i
-
-	third_max_area = 0.0
-	third_max_index = 0
-
-	for i in range(L):
-		n = len(contours[i])
-		area = 0.0
-		for j in range(n):
-			k = (j + 1) % n
-			area += contours[i][j][0] * contours[i][k][1]
-			area -= contours[i][k][0] * contours[i][j][1]
-		area = abs(area) / 2.0
-		if area > third_max_area and area < second_max_area:
-			third_max_area = area
-			third_max_index = i
-
-	fourth_max_area = 0.0
-	fourth_max_index = 0
-
-	for i in range(L):
-		n = len(contours[i])
-		area = 0.0
-		for j in range(n):
-			k = (j + 1) % n
-			area += contours[i][j][0] * contours[i][k][1]
-			area -= contours[i][k][0] * contours[i][j][1]
-		area = abs(area) / 2.0
-		if area > fourth_max_area and area < third_max_area:
-			fourth_max_area = area
-			fourth_max_index = i
-
-	contour1 = np.array([contours[max_index]])
-	contour2 = np.array([contours[second_max_index]])
-	contour3 = np.array([contours[third_max_index]])
-	contour4 = np.array([contours[fourth_max_index]])
-
-	x_dim = imghmi.shape[0]
-	y_dim = imghmi.shape[1]
-
-	x, y = np.meshgrid(np.arange(x_dim), np.arange(y_dim))
-	x, y = x.flatten(), y.flatten()
-
-	points = np.vstack((x,y)).T
-
-	vertices1 = contour1[0]
-	vertices2 = contour2[0]
-	vertices3 = contour3[0]
-	vertices4 = contour4[0]
-
-	path1 = Path(vertices1)
-	path2 = Path(vertices2)
-	path3 = Path(vertices3)
-	path4 = Path(vertices4)
-
-	c_mask1 = path1.contains_points(points)
-	c_mask1 = np.rot90(np.flip(c_mask1.reshape((y_dim,x_dim)), 1))
-
-	c_mask2 = path2.contains_points(points)
-	c_mask2 = np.rot90(np.flip(c_mask2.reshape((y_dim,x_dim)), 1))
-
-	c_mask3 = path3.contains_points(points)
-	c_mask3 = np.rot90(np.flip(c_mask3.reshape((y_dim,x_dim)), 1))
-
-	c_mask4 = path4.contains_points(points)
-	c_mask4 = np.rot90(np.flip(c_mask4.reshape((y_dim,x_dim)), 1))
-
-	c_mask = c_mask1.astype(float) + c_mask2.astype(float) + c_mask3.astype(float) + c_mask4.astype(float)
-	c_mask[c_mask == 2.] = 1.
-	c_mask[c_mask == 3.] = 1.
-	c_mask[c_mask == 4.] = 1.
+	c_mask = contour_mask(r_mask, 4)
 
 	c_mask = c_mask.astype(np.uint8)
 	c_mask = cv.morphologyEx(c_mask, cv.MORPH_CLOSE, np.ones((3,3)).astype(bool).astype(int))
@@ -993,9 +729,7 @@ p = copy(NEW_ID)
 
 RECORDER.info_text("Generating reverse zoom animation...")
 
-AIA171 = smap.Map(PATH171 + AIA171_DIR[2040])
-AIA304 = smap.Map(PATH304 + AIA304_DIR[2040])
-HMI = smap.Map(PATHHMI + HMI_DIR[2040])
+AIA171, AIA304, HMI = load_maps(2040)
 
 aia171_img = AIA171.data
 aia171_img[aia171_img < 1] = 1
@@ -1005,9 +739,7 @@ aia304_img = AIA304.data
 aia304_img[aia304_img < 1] = 1
 aia304_img = np.log(aia304_img)/AIA304.exposure_time.value
 
-scale = (HMI.scale[0] / AIA304.scale[0]).value
-scale = float("%.3f" % scale)
-hmi_img = hmialign(HMI.data, scale)
+hmi_img = hmialign()
 
 dim = 200
 
@@ -1054,10 +786,8 @@ p = copy(NEW_ID)
 
 RECORDER.info_text("Generating post-flare full-disk images...")
 
-for i in tqdm(range(2041, len(AIA171_DIR)), desc = "Working..."):
-	AIA171 = smap.Map(PATH171 + AIA171_DIR[i])
-	AIA304 = smap.Map(PATH304 + AIA304_DIR[i])
-	HMI = smap.Map(PATHHMI + HMI_DIR[i])
+for i in tqdm(range(2041, len(FRAMES)), desc = "Working..."):
+	AIA171, AIA304, HMI = load_maps(i)
 
 	RECORDER.info_text("Current timestamp: %s" % AIA171.date)
 
@@ -1076,9 +806,7 @@ for i in tqdm(range(2041, len(AIA171_DIR)), desc = "Working..."):
 	plt.imsave(IMAGE_SAVEPATH + "aia304-images/%05d" % NEW_ID, img, cmap = "sdoaia304", origin = "lower", vmin = 0, vmax = 3)
 
 	RECORDER.info_text("Aligning HMI full-disk image #%05d" % NEW_ID)
-	scale = (HMI.scale[0] / AIA304.scale[0]).value
-	scale = float("%.3f" % scale)
-	ALIGNED_RAW_HMI = hmialign(HMI.data, scale)
+	ALIGNED_RAW_HMI = hmialign()
 
 	RECORDER.sys_text("Writing full-disk HMI image #%05d..." % NEW_ID)
 	plt.imsave(IMAGE_SAVEPATH + "hmi-images/%05d" % NEW_ID, ALIGNED_RAW_HMI, cmap = "gray", origin = "lower", vmin = -120, vmax = 120)